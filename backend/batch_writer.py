@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List
+
+# Rows per upsert request and how many requests may be in flight at once
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "500"))
+SYNC_MAX_CONCURRENT_BATCHES = int(os.getenv("SYNC_MAX_CONCURRENT_BATCHES", "4"))
+
+# Attempts for a failing batch before it is split, with exponential backoff
+SYNC_BATCH_RETRIES = int(os.getenv("SYNC_BATCH_RETRIES", "2"))
+SYNC_RETRY_BACKOFF_SECONDS = float(os.getenv("SYNC_RETRY_BACKOFF_SECONDS", "0.5"))
+
+
+class BatchUpserter:
+    """
+    Upserts rows into a Supabase table in batches on a bounded pool of
+    concurrent requests. add() blocks while every slot is busy, which keeps
+    memory bounded when rows arrive faster than they can be written.
+
+    A batch that keeps failing is split in half and each half retried, down
+    to single rows, so one bad row doesn't fail the rest. Rows that still
+    fail are recorded in failed_keys and the run carries on.
+    """
+
+    def __init__(
+        self,
+        supabase,
+        table: str,
+        on_conflict: str = "id",
+        batch_size: int = SYNC_BATCH_SIZE,
+        max_concurrent: int = SYNC_MAX_CONCURRENT_BATCHES,
+        retries: int = SYNC_BATCH_RETRIES,
+        backoff_seconds: float = SYNC_RETRY_BACKOFF_SECONDS,
+    ):
+        self.supabase = supabase
+        self.table = table
+        self.on_conflict = on_conflict
+        self.batch_size = max(1, batch_size)
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+
+        self.requests = 0
+        self.written = 0
+        self.retried = 0
+        self.splits = 0
+        self.failed_keys: List[Any] = []
+
+        self._pending: List[Dict[str, Any]] = []
+        self._futures: List[Future] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrent))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrent), thread_name_prefix=f"upsert-{table}")
+
+    def add(self, rows: List[Dict[str, Any]]) -> None:
+        """Queue rows, sending every full batch"""
+        self._pending.extend(rows)
+        while len(self._pending) >= self.batch_size:
+            batch = self._pending[:self.batch_size]
+            self._pending = self._pending[self.batch_size:]
+            self._submit(batch)
+
+    def close(self) -> Dict[str, Any]:
+        """Send the final partial batch, wait for every request and return the stats"""
+        if self._pending:
+            self._submit(self._pending)
+            self._pending = []
+        for future in self._futures:
+            future.result()
+        self._executor.shutdown(wait=True)
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "written": self.written,
+                "retried": self.retried,
+                "splits": self.splits,
+                "failed": len(self.failed_keys),
+            }
+
+    def _submit(self, batch: List[Dict[str, Any]]) -> None:
+        # Wait for a free slot so at most max_concurrent batches are in flight
+        self._slots.acquire()
+        future = self._executor.submit(self._write, batch, self.retries + 1)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures = [pending for pending in self._futures if not pending.done()]
+        self._futures.append(future)
+
+    def _write(self, batch: List[Dict[str, Any]], attempts: int) -> None:
+        error = None
+        for attempt in range(attempts):
+            if attempt:
+                with self._lock:
+                    self.retried += 1
+                time.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+            try:
+                self.supabase.table(self.table).upsert(batch, on_conflict=self.on_conflict).execute()
+                with self._lock:
+                    self.requests += 1
+                    self.written += len(batch)
+                return
+            except Exception as e:
+                with self._lock:
+                    self.requests += 1
+                error = e
+
+        if len(batch) > 1:
+            # Halves get a single attempt each; only individual rows are retried again
+            with self._lock:
+                self.splits += 1
+            middle = len(batch) // 2
+            self._write(batch[:middle], 1 if middle > 1 else self.retries + 1)
+            self._write(batch[middle:], 1 if len(batch) - middle > 1 else self.retries + 1)
+            return
+
+        key = batch[0].get(self.on_conflict)
+        print(f"Error upserting {self.table} row {key}: {error}")
+        with self._lock:
+            self.failed_keys.append(key)
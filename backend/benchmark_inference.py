@@ -0,0 +1,182 @@
+"""
+Benchmark and parity-check the inference backends used for findings enrichment.
+
+Each backend runs in its own process so its memory can be measured on its own:
+
+    python benchmark_inference.py --backends pytorch,quantized,onnx --samples 256
+
+Outputs of every backend are compared against the full-precision PyTorch
+pipelines. The script exits non-zero when label or severity agreement falls
+below --min-agreement.
+"""
+import argparse
+import os
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+
+from enrichment import (
+    CLASSIFIER_MODEL,
+    CLASSIFIER_MODEL_REVISION,
+    INFERENCE_BACKENDS,
+    SEVERITY_MODEL,
+    SEVERITY_MODEL_REVISION,
+    build_pipeline,
+    run_pipeline_batched,
+    sentiment_to_severity,
+)
+
+# Representative Security Command Center finding descriptions
+SAMPLE_DESCRIPTIONS = [
+    "Service account key has not been rotated in over 90 days.",
+    "Firewall rule allows ingress from 0.0.0.0/0 on port 22.",
+    "Cloud Storage bucket is publicly accessible to allUsers.",
+    "Compute instance has a public IP address and no OS Login enforced.",
+    "User-managed service account has the Owner role on the project.",
+    "Account has leaked credentials found in a public repository.",
+    "Audit logging is disabled for Cloud SQL admin activity.",
+    "Default network with permissive firewall rules exists in the project.",
+    "Legacy ABAC authorization is enabled on the GKE cluster.",
+    "Customer-managed encryption keys are not used for the BigQuery dataset.",
+    "SSL policy allows weak cipher suites on the HTTPS load balancer.",
+    "Multi-factor authentication is not enforced for administrator accounts.",
+]
+
+
+def _load_descriptions(path: str, samples: int) -> List[str]:
+    if path:
+        with open(path) as f:
+            descriptions = [line.strip() for line in f if line.strip()]
+    else:
+        descriptions = SAMPLE_DESCRIPTIONS
+    return [descriptions[i % len(descriptions)] for i in range(samples)]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+def benchmark_backend(backend: str, texts: List[str], batch_size: int, single_items: int) -> Dict[str, Any]:
+    """Load both pipelines on one backend and time them (runs in a child process)"""
+    load_dotenv()
+    hf_token = os.getenv("HF_TOKEN")
+    baseline_rss = _peak_rss_mb()
+
+    started = time.perf_counter()
+    classifier = build_pipeline(CLASSIFIER_MODEL, CLASSIFIER_MODEL_REVISION, hf_token, backend)
+    severity_model = build_pipeline(SEVERITY_MODEL, SEVERITY_MODEL_REVISION, hf_token, backend)
+    load_seconds = time.perf_counter() - started
+
+    # Warm up kernels and allocator before timing
+    classifier(texts[:2], truncation=True)
+    severity_model(texts[:2], truncation=True)
+
+    # Per-item latency, one call per description
+    single_latencies = []
+    for text in texts[:single_items]:
+        started = time.perf_counter()
+        classifier(text, truncation=True)
+        severity_model(text, truncation=True)
+        single_latencies.append((time.perf_counter() - started) * 1000)
+
+    # Batched throughput through the same path the API uses
+    started = time.perf_counter()
+    classifications, _ = run_pipeline_batched(classifier, texts, "classifier", batch_size, True)
+    severities, _ = run_pipeline_batched(severity_model, texts, "severity", batch_size, True)
+    batched_seconds = time.perf_counter() - started
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        "single_ms_p50": round(statistics.median(single_latencies), 2),
+        "single_ms_p95": round(_percentile(single_latencies, 0.95), 2),
+        "batched_ms_per_item": round(batched_seconds * 1000 / len(texts), 2),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "model_rss_mb": round(_peak_rss_mb() - baseline_rss, 1),
+        "classifications": classifications,
+        "severities": severities,
+    }
+
+
+def compare_outputs(reference: Dict[str, Any], candidate: Dict[str, Any]) -> Dict[str, float]:
+    """Compare a backend's outputs with the full-precision reference"""
+    label_matches = 0
+    severity_matches = 0
+    score_deltas = []
+    pairs = list(zip(reference["classifications"], candidate["classifications"],
+                     reference["severities"], candidate["severities"]))
+
+    for ref_cls, cand_cls, ref_sev, cand_sev in pairs:
+        if ref_cls and cand_cls:
+            label_matches += ref_cls["label"] == cand_cls["label"]
+            score_deltas.append(abs(ref_cls["score"] - cand_cls["score"]))
+        if ref_sev and cand_sev:
+            severity_matches += sentiment_to_severity(ref_sev["score"]) == sentiment_to_severity(cand_sev["score"])
+            score_deltas.append(abs(ref_sev["score"] - cand_sev["score"]))
+
+    return {
+        "label_agreement": round(label_matches / len(pairs), 4),
+        "severity_agreement": round(severity_matches / len(pairs), 4),
+        "max_score_delta": round(max(score_deltas), 4) if score_deltas else 0.0,
+        "mean_score_delta": round(statistics.mean(score_deltas), 4) if score_deltas else 0.0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default=",".join(INFERENCE_BACKENDS))
+    parser.add_argument("--samples", type=int, default=256)
+    parser.add_argument("--single-items", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--input", default="", help="file with one description per line")
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    args = parser.parse_args()
+
+    backends = [backend.strip() for backend in args.backends.split(",") if backend.strip()]
+    if "pytorch" not in backends:
+        # The full-precision pipelines are the parity reference
+        backends.insert(0, "pytorch")
+
+    texts = _load_descriptions(args.input, args.samples)
+    results = {}
+    for backend in backends:
+        # A fresh process per backend keeps the memory numbers independent
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            results[backend] = pool.submit(
+                benchmark_backend, backend, texts, args.batch_size, args.single_items
+            ).result()
+
+    print(f"\n{'backend':<10} {'load s':>8} {'p50 ms':>8} {'p95 ms':>8} {'batch ms/item':>14} {'model MB':>9} "
+          f"{'labels':>7} {'severity':>9} {'max delta':>10}")
+    passed = True
+    for backend in backends:
+        result = results[backend]
+        parity = compare_outputs(results["pytorch"], result)
+        if min(parity["label_agreement"], parity["severity_agreement"]) < args.min_agreement:
+            passed = False
+        print(f"{backend:<10} {result['load_seconds']:>8} {result['single_ms_p50']:>8} {result['single_ms_p95']:>8} "
+              f"{result['batched_ms_per_item']:>14} {result['model_rss_mb']:>9} "
+              f"{parity['label_agreement']:>7} {parity['severity_agreement']:>9} {parity['max_score_delta']:>10}")
+
+    if not passed:
+        print(f"\nParity check failed: agreement below {args.min_agreement}")
+        return 1
+    print("\nParity check passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
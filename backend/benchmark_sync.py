@@ -0,0 +1,114 @@
+"""
+Benchmark the Security Command Center → Supabase sync against local fakes.
+
+Each size runs in its own process so memory can be measured on its own:
+
+    python benchmark_sync.py --sizes 1000,100000,1000000 --churn 0.01
+
+Every size runs two syncs. The first is the initial full sync into an empty
+table. The second is an incremental sync after --churn of the findings were
+re-observed, some of them becoming inactive. For each sync it reports
+wall-clock time, throughput, SCC list calls and pages, Supabase requests and
+peak memory. --latency-ms adds a delay to every Supabase request to model
+network round trips.
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict, List
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_phase(name: str, sync, scc, supabase) -> Dict[str, Any]:
+    scc.reset_counters()
+    supabase.reset_counters()
+    started = time.perf_counter()
+    success = sync(supabase=supabase, scc_client=scc)
+    seconds = time.perf_counter() - started
+
+    return {
+        "phase": name,
+        "success": success,
+        "seconds": round(seconds, 2),
+        "findings": scc.findings_served,
+        "findings_per_second": round(scc.findings_served / seconds) if seconds else 0,
+        "scc_list_calls": scc.list_calls,
+        "scc_pages": scc.pages_served,
+        "supabase_requests": supabase.request_count,
+        "supabase_rows_written": supabase.rows_written,
+        "top_requests": supabase.requests.most_common(3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def benchmark_size(count: int, churn: float, latency_ms: float, page_size: int) -> List[Dict[str, Any]]:
+    """Run a full and an incremental sync of count findings (runs in a child process)"""
+    # Configure the sync before it is imported
+    os.environ["GOOGLE_SCC_PARENTS"] = "organizations/benchmark"
+    os.environ["SCC_PAGE_SIZE"] = str(page_size)
+    os.environ["SYNC_MODE"] = "incremental"
+    # Severity inference is measured by benchmark_inference.py
+    os.environ.setdefault("SYNC_ENRICH_SEVERITY", "false")
+
+    from fake_scc import FakeSecurityCenterClient
+    from fake_supabase import FakeSupabase
+    from sync_findings import sync_findings_to_supabase
+
+    scc = FakeSecurityCenterClient(count)
+    supabase = FakeSupabase(latency_ms=latency_ms)
+    baseline_rss = _peak_rss_mb()
+
+    results = [_run_phase("full", sync_findings_to_supabase, scc, supabase)]
+    scc.churn(churn)
+    results.append(_run_phase("incremental", sync_findings_to_supabase, scc, supabase))
+
+    for result in results:
+        result["count"] = count
+        result["baseline_rss_mb"] = round(baseline_rss, 1)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000,1000000")
+    parser.add_argument("--churn", type=float, default=0.01, help="fraction of findings changed between syncs")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated latency per Supabase request")
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    results = []
+    for count in sizes:
+        # A fresh process per size keeps the memory numbers independent
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            results.extend(pool.submit(
+                benchmark_size, count, args.churn, args.latency_ms, args.page_size
+            ).result())
+
+    print(f"\n{'findings':>9} {'phase':<12} {'ok':>3} {'seconds':>8} {'fetched':>8} {'per sec':>8} "
+          f"{'scc calls':>9} {'pages':>6} {'db requests':>11} {'rows written':>12} {'peak MB':>8}")
+    for result in results:
+        print(f"{result['count']:>9} {result['phase']:<12} {'yes' if result['success'] else 'no':>3} "
+              f"{result['seconds']:>8} {result['findings']:>8} {result['findings_per_second']:>8} "
+              f"{result['scc_list_calls']:>9} {result['scc_pages']:>6} {result['supabase_requests']:>11} "
+              f"{result['supabase_rows_written']:>12} {result['peak_rss_mb']:>8}")
+
+    print("\nMost frequent Supabase requests:")
+    for result in results:
+        requests = ", ".join(f"{name} x{count}" for name, count in result["top_requests"])
+        print(f"  {result['count']:>9} {result['phase']:<12} {requests}")
+
+    return 0 if all(result["success"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,16 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
+
+# metrics is shared with the API modules one directory up
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT, render_metrics
 from ask import query_documents
 import logging
+import time
 
 # Load environment variables
 load_dotenv()
@@ -15,6 +22,28 @@ CORS(app)  # Enable CORS for Firebase frontend
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    REQUESTS_IN_FLIGHT.labels('chatbot').inc()
+
+@app.after_request
+def record_request_status(response):
+    g.response_status = response.status_code
+    return response
+
+@app.teardown_request
+def record_request_latency(error=None):
+    if 'request_started' not in g:
+        return
+    # Label by route template so arbitrary paths don't explode cardinality
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    status = str(g.get('response_status', 500))
+    REQUEST_LATENCY.labels('chatbot', request.method, route, status).observe(
+        time.perf_counter() - g.request_started
+    )
+    REQUESTS_IN_FLIGHT.labels('chatbot').dec()
+
 @app.route('/chat', methods=['POST'])
 def chat():
     try:
@@ -40,6 +69,11 @@ def chat():
         logger.error(f"Error processing chat request: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, mimetype=content_type)
+
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({'status': 'healthy'})
@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 from sentence_transformers import SentenceTransformer
 import chromadb
@@ -9,6 +10,12 @@ from typing import List, Dict
 from supabase import create_client, Client
 import json
 
+# The findings snapshot is shared with the API modules one directory up
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from dataset_version import DatasetVersionTracker
+from findings_store import OPEN_FINDINGS, FindingsStore
+from metrics import stage_timer
+
 # Load environment variables
 load_dotenv()
 
@@ -25,45 +32,37 @@ class SupabaseQueryEngine:
             raise ValueError("Supabase credentials not found in environment variables")
         
         self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
+        self.findings_store = FindingsStore(self.supabase, DatasetVersionTracker(self.supabase))
         logger.info("Supabase client initialized successfully")
     
     def fetch_findings_data(self) -> List[Dict]:
-        """Fetch all security findings from Supabase"""
+        """Fetch the open security findings from the shared findings snapshot"""
         try:
-            response = self.supabase.table('security_findings').select('*').execute()
-            logger.info(f"Fetched {len(response.data)} findings from Supabase")
-            return response.data
+            findings, _ = self.findings_store.get().page(OPEN_FINDINGS)
+            logger.info(f"Fetched {len(findings)} findings from snapshot")
+            return findings
         except Exception as e:
             logger.error(f"Error fetching findings: {str(e)}")
             return []
     
     def get_findings_summary(self) -> Dict:
-        """Get summary statistics of findings"""
-        findings = self.fetch_findings_data()
-        if not findings:
+        """Get summary statistics of findings from the snapshot indexes"""
+        try:
+            snapshot = self.findings_store.get()
+        except Exception as e:
+            logger.error(f"Error fetching findings: {str(e)}")
             return {"total": 0, "by_severity": {}, "by_category": {}}
         
-        summary = {
-            "total": len(findings),
-            "by_severity": {},
-            "by_category": {},
-            "by_status": {}
-        }
-        
-        for finding in findings:
-            # Count by severity
-            severity = finding.get('severity', 'UNKNOWN')
-            summary["by_severity"][severity] = summary["by_severity"].get(severity, 0) + 1
-            
-            # Count by category
-            category = finding.get('category', 'UNKNOWN')
-            summary["by_category"][category] = summary["by_category"].get(category, 0) + 1
-            
-            # Count by status
-            status = finding.get('status', 'UNKNOWN')
-            summary["by_status"][status] = summary["by_status"].get(status, 0) + 1
+        if not snapshot.open_ids:
+            return {"total": 0, "by_severity": {}, "by_category": {}}
         
-        return summary
+        # Resolved findings stay in the table until archived but are no longer open
+        return {
+            "total": len(snapshot.open_ids),
+            "by_severity": snapshot.count_by("severity", OPEN_FINDINGS),
+            "by_category": snapshot.count_by("category", OPEN_FINDINGS),
+            "by_status": snapshot.count_by("status", OPEN_FINDINGS)
+        }
     
     def search_findings(self, query: str) -> List[Dict]:
         """Search findings based on query terms"""
@@ -147,15 +146,17 @@ class CMMCQueryEngine:
             logger.warning("Collection is empty - no documents to search")
             return []
         
-        question_embedding = self.model.encode([question]).tolist()[0]
+        with stage_timer("question_embedding"):
+            question_embedding = self.model.encode([question]).tolist()[0]
         logger.info(f"Generated embedding of length: {len(question_embedding)}")
         
         try:
-            results = self.collection.query(
-                query_embeddings=[question_embedding],
-                n_results=min(n_results, count),  # Don't ask for more than available
-                include=["documents", "metadatas", "distances"]  # Include distances for debugging
-            )
+            with stage_timer("chroma_retrieval"):
+                results = self.collection.query(
+                    query_embeddings=[question_embedding],
+                    n_results=min(n_results, count),  # Don't ask for more than available
+                    include=["documents", "metadatas", "distances"]  # Include distances for debugging
+                )
             
             logger.info(f"Query returned {len(results.get('documents', [[]])[0])} results")
             
@@ -231,7 +232,8 @@ Answer:"""
         try:
             # print(prompt)
             logger.info("Sending request to Together AI...")
-            response = requests.post(api_url, headers=headers, json=payload, timeout=30)
+            with stage_timer("llm_call"):
+                response = requests.post(api_url, headers=headers, json=payload, timeout=30)
             response.raise_for_status()
             result = response.json()
 
@@ -332,7 +334,8 @@ Answer:"""
         }
 
         try:
-            response = requests.post(api_url, headers=headers, json=payload, timeout=30)
+            with stage_timer("llm_call"):
+                response = requests.post(api_url, headers=headers, json=payload, timeout=30)
             response.raise_for_status()
             result = response.json()
             return result['choices'][0]['message']['content'].strip()
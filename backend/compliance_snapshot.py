@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from findings_query import fetch_all_findings
+from metrics import stage_timer
+from scoring import SCORE_CATEGORIES, SCORING_COLUMNS, aggregate_arrays, build_score_arrays, empty_aggregates
+
+SNAPSHOT_TABLE = "compliance_score_snapshot"
+
+
+def load_snapshot(supabase) -> Optional[Tuple[Dict[str, Dict[str, Any]], Optional[str]]]:
+    """
+    Load the materialized per-category aggregates, including open-finding
+    counts by severity.
+
+    Returns the aggregates and the time they were last updated, or None if no
+    snapshot has been built yet. Rows saved before severity counts were
+    stored fail snapshot_complete.
+    """
+    try:
+        with stage_timer("compliance_snapshot_fetch"):
+            response = supabase.table(SNAPSHOT_TABLE).select("*").execute()
+    except Exception as e:
+        print(f"Error fetching compliance snapshot: {e}")
+        return None
+
+    if hasattr(response, "error") and response.error is not None:
+        print(f"Error fetching compliance snapshot: {response.error}")
+        return None
+    if not response.data:
+        return None
+
+    aggregates = empty_aggregates()
+    last_updated = None
+    for row in response.data:
+        cat = row.get("category")
+        if cat not in aggregates:
+            continue
+        aggregates[cat] = {
+            "count": int(row.get("count") or 0),
+            "weighted_sum": float(row.get("weighted_sum") or 0),
+            "ai_weighted_sum": float(row.get("ai_weighted_sum") or 0),
+            "severity_counts": {
+                severity: int(count) for severity, count in (row.get("severity_counts") or {}).items()
+            },
+        }
+        updated_at = row.get("updated_at")
+        if updated_at and (last_updated is None or updated_at > last_updated):
+            last_updated = updated_at
+
+    return aggregates, last_updated
+
+
+def snapshot_complete(aggregates: Dict[str, Dict[str, Any]]) -> bool:
+    """Whether every category's severity counts add up to its count, so deltas can be applied"""
+    return all(
+        sum((data.get("severity_counts") or {}).values()) == data["count"]
+        for data in aggregates.values()
+    )
+
+
+def save_snapshot(supabase, aggregates: Dict[str, Dict[str, Any]]) -> None:
+    """Write the per-category aggregates back to the snapshot table"""
+    updated_at = datetime.now(timezone.utc).isoformat()
+    rows = [
+        {
+            "category": cat,
+            "count": int(aggregates[cat]["count"]),
+            "weighted_sum": aggregates[cat]["weighted_sum"],
+            "ai_weighted_sum": aggregates[cat]["ai_weighted_sum"],
+            # Saved with the score so the two can never drift apart
+            "severity_counts": {
+                severity: int(count)
+                for severity, count in (aggregates[cat].get("severity_counts") or {}).items() if count
+            },
+            "updated_at": updated_at,
+        }
+        for cat in SCORE_CATEGORIES
+    ]
+    supabase.table(SNAPSHOT_TABLE).upsert(rows, on_conflict="category").execute()
+
+
+def rebuild_snapshot(supabase, rows: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+    """Recompute the snapshot from the full findings table (or rows already read from it)"""
+    if rows is None:
+        rows = fetch_all_findings(supabase, SCORING_COLUMNS)
+
+    aggregates = aggregate_arrays(build_score_arrays(rows))
+    save_snapshot(supabase, aggregates)
+    print(f"Rebuilt compliance snapshot from {len(rows)} findings")
+    return aggregates
+
+
+if __name__ == "__main__":
+    import os
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    load_dotenv()
+    rebuild_snapshot(create_client(os.getenv("VITE_SUPABASE_URL"), os.getenv("SUPABASE_KEY")))
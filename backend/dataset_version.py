@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+DATASET_VERSION_TABLE = "dataset_version"
+
+# How long the API trusts a fetched version before asking Supabase again
+DATASET_VERSION_TTL_SECONDS = float(os.getenv("DATASET_VERSION_TTL_SECONDS", "5"))
+
+
+def bump_dataset_version(supabase) -> Optional[str]:
+    """Record that the findings data changed, invalidating cached API responses"""
+    version = uuid.uuid4().hex
+    try:
+        supabase.table(DATASET_VERSION_TABLE).upsert({
+            "id": 1,
+            "version": version,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }).execute()
+        return version
+    except Exception as e:
+        print(f"Error bumping dataset version: {e}")
+        return None
+
+
+def fetch_dataset_version(supabase) -> Optional[str]:
+    """Read the current dataset version, or None if it can't be determined"""
+    try:
+        response = supabase.table(DATASET_VERSION_TABLE).select("version").eq("id", 1).execute()
+    except Exception as e:
+        print(f"Error fetching dataset version: {e}")
+        return None
+
+    if hasattr(response, "error") and response.error is not None:
+        print(f"Error fetching dataset version: {response.error}")
+        return None
+    if not response.data:
+        return None
+    return response.data[0]["version"]
+
+
+class DatasetVersionTracker:
+    """Caches the dataset version for a short TTL so polls don't each hit Supabase"""
+
+    def __init__(self, supabase, ttl_seconds: float = DATASET_VERSION_TTL_SECONDS):
+        self.supabase = supabase
+        self.ttl_seconds = ttl_seconds
+        self._version: Optional[str] = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[str]:
+        """Return the dataset version, refreshing it once the TTL has passed"""
+        with self._lock:
+            if time.monotonic() - self._fetched_at >= self.ttl_seconds:
+                self._version = fetch_dataset_version(self.supabase)
+                self._fetched_at = time.monotonic()
+            return self._version
@@ -0,0 +1,381 @@
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from enrichment_cache import content_hash, get_enrichment_cache
+from metrics import MODEL_LOAD_SECONDS, MODELS_WARM, STAGE_LATENCY
+
+# HuggingFace models used to enrich security findings
+CLASSIFIER_MODEL = "unitary/toxic-bert"
+SEVERITY_MODEL = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+CLASSIFIER_MODEL_REVISION = os.getenv("CLASSIFIER_MODEL_REVISION", "main")
+SEVERITY_MODEL_REVISION = os.getenv("SEVERITY_MODEL_REVISION", "main")
+
+# Inference backend: "pytorch" (full precision), "quantized" (int8 dynamic
+# quantization of the linear layers) or "onnx" (ONNX Runtime via optimum)
+INFERENCE_BACKENDS = ("pytorch", "quantized", "onnx")
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "pytorch").lower()
+
+# Exported ONNX models are saved here on first use, so later cold starts load
+# them instead of exporting again
+ONNX_MODEL_DIR = os.getenv(
+    "ONNX_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx_models"),
+)
+
+# Address of a shared inference_worker.py process; when set, models are not
+# loaded in this process and inference is sent to the worker instead
+INFERENCE_WORKER_ADDRESS = os.getenv("INFERENCE_WORKER_ADDRESS")
+# How long an API process waits for the worker before reporting failure
+INFERENCE_WORKER_CONNECT_TIMEOUT_SECONDS = float(os.getenv("INFERENCE_WORKER_CONNECT_TIMEOUT_SECONDS", "600"))
+
+# Batching settings for pipeline inference
+ENRICHMENT_BATCH_SIZE = int(os.getenv("ENRICHMENT_BATCH_SIZE", "32"))
+ENRICHMENT_TRUNCATION = os.getenv("ENRICHMENT_TRUNCATION", "true").lower() == "true"
+
+
+# Loaded pipelines and warm-up status, filled in by load_models
+_models: Dict[str, Any] = {"classifier": None, "severity_model": None}
+_model_status: Dict[str, Any] = {
+    "state": "pending",
+    "error": None,
+    "load_seconds": {},
+    "started_at": None,
+    "finished_at": None,
+}
+# Enrichment cache keys of the loaded pipelines. They describe whichever
+# process runs inference, so with a worker they come from its handshake.
+_cache_ids: Dict[str, str] = {}
+_warmup_thread: Optional[threading.Thread] = None
+
+
+def model_cache_id(model: str, revision: str, backend: str = INFERENCE_BACKEND) -> str:
+    """Identify a model's outputs in the enrichment cache"""
+    model_id = f"{model}@{revision}"
+    # Quantized and ONNX outputs differ slightly, so they are cached separately
+    return model_id if backend == "pytorch" else f"{model_id}+{backend}"
+
+
+def onnx_export_dir(model: str, revision: str) -> str:
+    """Directory holding the exported ONNX copy of a model revision"""
+    return os.path.join(ONNX_MODEL_DIR, f"{model.replace('/', '--')}@{revision}")
+
+
+def export_onnx_model(model: str, revision: str, hf_token: Optional[str], export_dir: str) -> None:
+    """Export a model to ONNX once and save it, with its tokenizer, to export_dir"""
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from transformers import AutoTokenizer
+
+    print(f"Exporting {model}@{revision} to ONNX in {export_dir}")
+    onnx_model = ORTModelForSequenceClassification.from_pretrained(
+        model, revision=revision, token=hf_token, export=True
+    )
+    tokenizer = AutoTokenizer.from_pretrained(model, revision=revision, token=hf_token)
+
+    # Saved to a private directory and renamed into place, so a process
+    # exporting at the same time never loads a half-written model
+    staging_dir = f"{export_dir}.tmp-{os.getpid()}"
+    onnx_model.save_pretrained(staging_dir)
+    tokenizer.save_pretrained(staging_dir)
+    try:
+        os.replace(staging_dir, export_dir)
+    except OSError:
+        # Another process finished first; keep its copy
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def build_pipeline(model: str, revision: str, hf_token: Optional[str] = None, backend: str = INFERENCE_BACKEND):
+    """Build a text-classification pipeline on the selected inference backend"""
+    # Imported here so the API can start serving before torch is loaded
+    from transformers import pipeline
+
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend}, expected one of {INFERENCE_BACKENDS}")
+
+    if backend == "onnx":
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        from transformers import AutoTokenizer
+
+        export_dir = onnx_export_dir(model, revision)
+        if not os.path.isfile(os.path.join(export_dir, "model.onnx")):
+            export_onnx_model(model, revision, hf_token, export_dir)
+        onnx_model = ORTModelForSequenceClassification.from_pretrained(export_dir)
+        tokenizer = AutoTokenizer.from_pretrained(export_dir)
+        return pipeline("text-classification", model=onnx_model, tokenizer=tokenizer)
+
+    text_pipeline = pipeline("text-classification", model=model, revision=revision, token=hf_token)
+    if backend == "quantized":
+        import torch
+
+        text_pipeline.model = torch.quantization.quantize_dynamic(
+            text_pipeline.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    return text_pipeline
+
+
+def load_local_models(hf_token: Optional[str] = None) -> bool:
+    """Load the classifier and severity pipelines, recording how long each took"""
+    _model_status.update(state="loading", error=None, started_at=time.time())
+    try:
+        started = time.perf_counter()
+        classifier = build_pipeline(CLASSIFIER_MODEL, CLASSIFIER_MODEL_REVISION, hf_token)
+        _model_status["load_seconds"]["classifier"] = round(time.perf_counter() - started, 3)
+        MODEL_LOAD_SECONDS.labels("classifier").set(_model_status["load_seconds"]["classifier"])
+
+        started = time.perf_counter()
+        severity_model = build_pipeline(SEVERITY_MODEL, SEVERITY_MODEL_REVISION, hf_token)
+        _model_status["load_seconds"]["severity_model"] = round(time.perf_counter() - started, 3)
+        MODEL_LOAD_SECONDS.labels("severity_model").set(_model_status["load_seconds"]["severity_model"])
+
+        _models.update(classifier=classifier, severity_model=severity_model)
+        _cache_ids.update(
+            classifier=model_cache_id(CLASSIFIER_MODEL, CLASSIFIER_MODEL_REVISION),
+            severity_model=model_cache_id(SEVERITY_MODEL, SEVERITY_MODEL_REVISION),
+        )
+        _model_status.update(state="ready", finished_at=time.time())
+        MODELS_WARM.set(1)
+        print(f"HuggingFace models loaded successfully on {INFERENCE_BACKEND} in {_model_status['load_seconds']}")
+        return True
+    except Exception as e:
+        _model_status.update(state="failed", error=str(e), finished_at=time.time())
+        print(f"Error loading HuggingFace models: {e}")
+        return False
+
+
+def connect_inference_worker(
+    address: str,
+    poll_seconds: float = 2.0,
+    timeout_seconds: float = INFERENCE_WORKER_CONNECT_TIMEOUT_SECONDS,
+) -> bool:
+    """Use the shared inference worker's pipelines, waiting until it has warmed up"""
+    from inference_worker import InferenceWorkerClient, RemotePipeline, worker_authkey
+
+    _model_status.update(state="loading", error=None, started_at=time.time())
+    try:
+        client = InferenceWorkerClient(address, worker_authkey())
+        deadline = time.monotonic() + timeout_seconds
+        while True:
+            try:
+                worker_status = client.call("status")
+            except OSError as e:
+                # The worker may still be starting
+                print(f"Waiting for inference worker at {address}: {e}")
+                worker_status = {"state": "pending"}
+            if worker_status["state"] == "ready":
+                break
+            if worker_status["state"] == "failed":
+                raise RuntimeError(f"inference worker failed to load its models: {worker_status.get('error')}")
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"inference worker was not ready after {timeout_seconds:.0f}s")
+            time.sleep(poll_seconds)
+
+        # Cache results under the worker's backend and revisions, not this process's settings
+        _cache_ids.update(worker_status.get("cache_ids") or {
+            "classifier": model_cache_id(CLASSIFIER_MODEL, CLASSIFIER_MODEL_REVISION, worker_status.get("backend")),
+            "severity_model": model_cache_id(SEVERITY_MODEL, SEVERITY_MODEL_REVISION, worker_status.get("backend")),
+        })
+        _models.update(
+            classifier=RemotePipeline(client, "classifier"),
+            severity_model=RemotePipeline(client, "severity"),
+        )
+        _model_status.update(state="ready", finished_at=time.time())
+        MODELS_WARM.set(1)
+        print(f"Connected to inference worker at {address} ({_cache_ids})")
+        return True
+    except Exception as e:
+        _model_status.update(state="failed", error=str(e), finished_at=time.time())
+        print(f"Error connecting to inference worker: {e}")
+        return False
+
+
+def load_models(hf_token: Optional[str] = None) -> bool:
+    """Load the pipelines locally, or attach to the shared inference worker if configured"""
+    if INFERENCE_WORKER_ADDRESS:
+        return connect_inference_worker(INFERENCE_WORKER_ADDRESS)
+    return load_local_models(hf_token)
+
+
+def start_model_warmup(hf_token: Optional[str] = None) -> threading.Thread:
+    """Load the models on a background thread so the API can serve immediately"""
+    global _warmup_thread
+    if _warmup_thread is None or not _warmup_thread.is_alive():
+        _warmup_thread = threading.Thread(
+            target=load_models, args=(hf_token,), name="model-warmup", daemon=True
+        )
+        _warmup_thread.start()
+    return _warmup_thread
+
+
+def get_models() -> Tuple[Any, Any]:
+    """Return the (classifier, severity_model) pipelines, None until loaded"""
+    return _models["classifier"], _models["severity_model"]
+
+
+def models_ready() -> bool:
+    """Whether both pipelines have finished loading"""
+    return _model_status["state"] == "ready"
+
+
+def model_status() -> Dict[str, Any]:
+    """Return the warm-up state, error and per-model load times"""
+    return {
+        **_model_status,
+        "backend": INFERENCE_BACKEND,
+        "worker": INFERENCE_WORKER_ADDRESS,
+        "cache_ids": dict(_cache_ids),
+        "load_seconds": dict(_model_status["load_seconds"]),
+    }
+
+
+def sentiment_to_severity(sentiment_score: float) -> str:
+    """Map a sentiment score to a security severity"""
+    if sentiment_score > 0.8:
+        return "CRITICAL"
+    elif sentiment_score > 0.6:
+        return "HIGH"
+    elif sentiment_score > 0.4:
+        return "MEDIUM"
+    else:
+        return "LOW"
+
+
+def _first_result(output: Any) -> Optional[Dict[str, Any]]:
+    """Normalize a pipeline output to the top result dict"""
+    if isinstance(output, list):
+        return output[0] if output else None
+    return output
+
+
+def run_pipeline_batched(
+    model,
+    texts: List[str],
+    label: str,
+    batch_size: Optional[int] = None,
+    truncation: Optional[bool] = None,
+) -> Tuple[List[Optional[Dict[str, Any]]], List[Dict[str, Any]]]:
+    """
+    Run a text-classification pipeline over texts in batches.
+
+    Returns the top result for each text (None where inference failed), in the
+    same order as the input, together with the timing of each batch.
+    """
+    batch_size = batch_size or ENRICHMENT_BATCH_SIZE
+    truncation = ENRICHMENT_TRUNCATION if truncation is None else truncation
+
+    results: List[Optional[Dict[str, Any]]] = []
+    timings: List[Dict[str, Any]] = []
+
+    for batch_number, start in enumerate(range(0, len(texts), batch_size), start=1):
+        batch = texts[start:start + batch_size]
+        started = time.perf_counter()
+
+        try:
+            outputs = [_first_result(output) for output in
+                       model(batch, batch_size=len(batch), truncation=truncation)]
+        except Exception as e:
+            # Fall back to per-item calls so one bad description only loses itself
+            print(f"Error in batched {label} inference, retrying per item: {e}")
+            outputs = []
+            for text in batch:
+                try:
+                    outputs.append(_first_result(model(text, truncation=truncation)))
+                except Exception as item_error:
+                    print(f"Error in {label} inference: {item_error}")
+                    outputs.append(None)
+
+        elapsed = time.perf_counter() - started
+        STAGE_LATENCY.labels(f"inference_{label}").observe(elapsed)
+        results.extend(outputs)
+        timings.append({
+            "model": label,
+            "batch": batch_number,
+            "size": len(batch),
+            "seconds": round(elapsed, 4),
+        })
+        print(f"{label} batch {batch_number}: {len(batch)} items in {elapsed:.3f}s")
+
+    return results, timings
+
+
+def run_pipeline_cached(
+    model,
+    model_id: str,
+    texts: List[str],
+    label: str,
+    batch_size: Optional[int] = None,
+    truncation: Optional[bool] = None,
+) -> Tuple[List[Optional[Dict[str, Any]]], List[Dict[str, Any]]]:
+    """
+    Like run_pipeline_batched, but serves results from the enrichment cache
+    and only runs inference on unique descriptions that are not cached yet.
+    """
+    cache = get_enrichment_cache()
+    if cache is None:
+        return run_pipeline_batched(model, texts, label, batch_size, truncation)
+
+    hashes = [content_hash(text) for text in texts]
+    cached = cache.get_many(model_id, hashes)
+
+    # Only infer each uncached description once
+    pending: Dict[str, str] = {}
+    for key, text in zip(hashes, texts):
+        if key not in cached and key not in pending:
+            pending[key] = text
+
+    timings: List[Dict[str, Any]] = []
+    if pending:
+        outputs, timings = run_pipeline_batched(
+            model, list(pending.values()), label, batch_size, truncation
+        )
+        fresh = [(key, output) for key, output in zip(pending, outputs) if output is not None]
+        cache.put_many(model_id, fresh)
+        cached.update(fresh)
+
+    return [cached.get(key) for key in hashes], timings
+
+
+def enrich_findings(
+    findings: List[Dict[str, Any]],
+    classifier,
+    severity_model=None,
+    batch_size: Optional[int] = None,
+    truncation: Optional[bool] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Enrich findings in place with AI classification when a classifier is
+    given and AI severity and confidence when a severity model is given.
+
+    Returns the per-batch timings of every pipeline that was run.
+    """
+    targets = [finding for finding in findings if "description" in finding]
+    if not (classifier or severity_model) or not targets:
+        return []
+
+    texts = [finding["description"] for finding in targets]
+    timings: List[Dict[str, Any]] = []
+
+    classifications: List[Optional[Dict[str, Any]]] = [None] * len(targets)
+    if classifier:
+        classifications, classifier_timings = run_pipeline_cached(
+            classifier, _cache_ids.get("classifier") or model_cache_id(CLASSIFIER_MODEL, CLASSIFIER_MODEL_REVISION),
+            texts, "classifier", batch_size, truncation
+        )
+        timings.extend(classifier_timings)
+
+    severities: List[Optional[Dict[str, Any]]] = [None] * len(targets)
+    if severity_model:
+        severities, severity_timings = run_pipeline_cached(
+            severity_model, _cache_ids.get("severity_model") or model_cache_id(SEVERITY_MODEL, SEVERITY_MODEL_REVISION),
+            texts, "severity", batch_size, truncation
+        )
+        timings.extend(severity_timings)
+
+    for finding, classification, severity in zip(targets, classifications, severities):
+        if severity is not None:
+            finding["ai_severity"] = sentiment_to_severity(severity["score"])
+            finding["ai_confidence"] = severity["score"]
+        if classification is not None:
+            finding["ai_classification"] = classification
+
+    return timings
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from metrics import record_cache_lookups
+
+# Cache location and size bound
+ENRICHMENT_CACHE_PATH = os.getenv(
+    "ENRICHMENT_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "enrichment_cache.db"),
+)
+ENRICHMENT_CACHE_MAX_ENTRIES = int(os.getenv("ENRICHMENT_CACHE_MAX_ENTRIES", "100000"))
+
+
+def content_hash(text: str) -> str:
+    """Hash a finding description for use as a cache key"""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+class EnrichmentCache:
+    """
+    Persistent SQLite cache of model outputs keyed by description hash and
+    model name/revision, with least-recently-used eviction.
+    """
+
+    def __init__(self, path: str = ENRICHMENT_CACHE_PATH, max_entries: int = ENRICHMENT_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS enrichment_cache (
+                content_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                result TEXT NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (content_hash, model)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS enrichment_cache_last_access ON enrichment_cache (last_access)"
+        )
+        self._conn.commit()
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Look up cached results for the given hashes, refreshing their recency"""
+        hashes = list(dict.fromkeys(hashes))
+        found: Dict[str, Dict[str, Any]] = {}
+        now = time.time()
+
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT content_hash, result FROM enrichment_cache "
+                    f"WHERE model = ? AND content_hash IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                for key, result in rows:
+                    found[key] = json.loads(result)
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE enrichment_cache SET last_access = ? WHERE model = ? AND content_hash = ?",
+                    [(now, model, key) for key in found],
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+            record_cache_lookups("enrichment", len(found), len(hashes) - len(found))
+
+        return found
+
+    def put_many(self, model: str, entries: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Store results for the given hashes and evict the least recently used overflow"""
+        if not entries:
+            return
+        now = time.time()
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO enrichment_cache (content_hash, model, result, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                [(key, model, json.dumps(result), now) for key, result in entries],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM enrichment_cache").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM enrichment_cache WHERE rowid IN "
+                "(SELECT rowid FROM enrichment_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM enrichment_cache").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "size": size,
+                "max_entries": self.max_entries,
+            }
+
+
+_cache: Optional[EnrichmentCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_enrichment_cache() -> Optional[EnrichmentCache]:
+    """Return the shared enrichment cache, or None when it is disabled or unavailable"""
+    global _cache
+    if os.getenv("ENRICHMENT_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = EnrichmentCache()
+            except Exception as e:
+                print(f"Error opening enrichment cache: {e}")
+                return None
+        return _cache
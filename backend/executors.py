@@ -0,0 +1,51 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+# Threads for blocking Supabase/SQLite calls and for model inference
+IO_MAX_WORKERS = int(os.getenv("IO_MAX_WORKERS", "16"))
+INFERENCE_MAX_WORKERS = int(os.getenv("INFERENCE_MAX_WORKERS", "1"))
+
+# How many calls of each kind may be queued or running at once; others wait
+# on the event loop without holding a thread
+IO_MAX_CONCURRENCY = int(os.getenv("IO_MAX_CONCURRENCY", str(IO_MAX_WORKERS * 4)))
+INFERENCE_MAX_CONCURRENCY = int(os.getenv("INFERENCE_MAX_CONCURRENCY", str(INFERENCE_MAX_WORKERS * 2)))
+
+io_executor = ThreadPoolExecutor(max_workers=IO_MAX_WORKERS, thread_name_prefix="io")
+inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_MAX_WORKERS, thread_name_prefix="inference")
+
+_io_semaphore: Optional[asyncio.Semaphore] = None
+_inference_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _semaphores():
+    # Created lazily so they bind to the running event loop
+    global _io_semaphore, _inference_semaphore
+    if _io_semaphore is None:
+        _io_semaphore = asyncio.Semaphore(IO_MAX_CONCURRENCY)
+        _inference_semaphore = asyncio.Semaphore(INFERENCE_MAX_CONCURRENCY)
+    return _io_semaphore, _inference_semaphore
+
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking I/O call on the I/O thread pool"""
+    semaphore, _ = _semaphores()
+    async with semaphore:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(io_executor, partial(func, *args, **kwargs))
+
+
+async def run_inference(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run CPU-heavy model inference on the dedicated inference executor"""
+    _, semaphore = _semaphores()
+    async with semaphore:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(inference_executor, partial(func, *args, **kwargs))
+
+
+def shutdown_executors() -> None:
+    """Stop both thread pools, letting running calls finish"""
+    io_executor.shutdown(wait=True)
+    inference_executor.shutdown(wait=True)
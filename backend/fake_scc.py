@@ -0,0 +1,204 @@
+"""
+In-process stand-in for the Security Command Center list_findings API.
+
+Generates synthetic findings on the fly from a few compact arrays, so a
+million findings cost megabytes rather than a million objects. Supports the
+filters and request fields the sync sends (state, event_time, severity
+shards, name, page_size and compare_duration) and counts every call and
+page. Name clauses are alternatives, as the sync joins them with OR.
+"""
+import random
+import re
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+# SCC enum values (google.cloud.securitycenter_v1.Finding.State / Severity)
+STATE_ACTIVE = 1
+STATE_INACTIVE = 2
+SEVERITY_VALUES = {"CRITICAL": 1, "HIGH": 2, "MEDIUM": 3, "LOW": 4}
+SEVERITY_NAMES = {value: name for name, value in SEVERITY_VALUES.items()}
+
+DEFAULT_CATEGORY_MIX = {
+    "OPEN_FIREWALL": 0.25,
+    "PUBLIC_BUCKET_ACL": 0.15,
+    "IAM_ADMIN_SERVICE_ACCOUNT": 0.2,
+    "PUBLIC_IP_ADDRESS": 0.2,
+    "WEAK_SSL_POLICY": 0.1,
+    "AUDIT_LOGGING_DISABLED": 0.1,
+}
+DEFAULT_SEVERITY_MIX = {"CRITICAL": 0.05, "HIGH": 0.2, "MEDIUM": 0.45, "LOW": 0.3}
+
+_FILTER_CLAUSE = re.compile(r'(\w+)\s*(>=|<=|=|>|<)\s*"([^"]*)"')
+
+
+class _Finding:
+    __slots__ = ("name", "category", "severity", "description", "resource_name",
+                 "create_time", "event_time", "state")
+
+
+class _StateChange:
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class _ListFindingsResult:
+    __slots__ = ("finding", "state_change")
+
+    def __init__(self, finding: _Finding, state_change: str):
+        self.finding = finding
+        self.state_change = _StateChange(state_change)
+
+
+class _ListFindingsPage:
+    __slots__ = ("list_findings_results",)
+
+    def __init__(self, results: List[_ListFindingsResult]):
+        self.list_findings_results = results
+
+
+class _ListFindingsPager:
+    def __init__(self, pages: Iterator[_ListFindingsPage]):
+        self.pages = pages
+
+    def __iter__(self):
+        for page in self.pages:
+            yield from page.list_findings_results
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc)
+
+
+def _weighted_codes(count: int, mix: Dict[str, float], rng: random.Random) -> array:
+    names = list(mix)
+    codes = rng.choices(range(len(names)), weights=[mix[name] for name in names], k=count)
+    return array("B", codes)
+
+
+class FakeSecurityCenterClient:
+    """Serves synthetic findings through the list_findings request/pager shape"""
+
+    def __init__(
+        self,
+        count: int,
+        category_mix: Optional[Dict[str, float]] = None,
+        severity_mix: Optional[Dict[str, float]] = None,
+        seed: int = 0,
+        max_page_size: int = 1000,
+    ):
+        self.count = count
+        self.max_page_size = max_page_size
+        self.rng = random.Random(seed)
+        self.categories = list(category_mix or DEFAULT_CATEGORY_MIX)
+        self.severities = list(severity_mix or DEFAULT_SEVERITY_MIX)
+        self.category_codes = _weighted_codes(count, category_mix or DEFAULT_CATEGORY_MIX, self.rng)
+        self.severity_codes = _weighted_codes(count, severity_mix or DEFAULT_SEVERITY_MIX, self.rng)
+
+        # Per-finding timestamps as epoch seconds, and state
+        now = datetime.now(timezone.utc).timestamp()
+        self.create_times = array("d", (now - 86400 - self.rng.random() * 86400 for _ in range(count)))
+        self.event_times = array("d", self.create_times)
+        self.states = bytearray([STATE_ACTIVE]) * count
+
+        self.list_calls = 0
+        self.pages_served = 0
+        self.findings_served = 0
+
+    def churn(self, rate: float, resolve_fraction: float = 0.1) -> int:
+        """Touch a fraction of findings as if SCC re-observed them; some become inactive"""
+        now = datetime.now(timezone.utc).timestamp()
+        changed = self.rng.sample(range(self.count), int(self.count * rate))
+        for index in changed:
+            self.event_times[index] = now
+            if self.rng.random() < resolve_fraction:
+                self.states[index] = STATE_INACTIVE
+            else:
+                self.states[index] = STATE_ACTIVE
+        return len(changed)
+
+    def reset_counters(self) -> None:
+        self.list_calls = 0
+        self.pages_served = 0
+        self.findings_served = 0
+
+    def _finding(self, index: int, parent: str) -> _Finding:
+        finding = _Finding()
+        finding.name = f"{parent}/findings/f{index:08d}"
+        finding.category = self.categories[self.category_codes[index]]
+        finding.severity = SEVERITY_VALUES.get(self.severities[self.severity_codes[index]], 0)
+        finding.description = f"Synthetic {finding.category.lower().replace('_', ' ')} finding {index}"
+        finding.resource_name = f"//compute.googleapis.com/projects/fake/zones/us-central1-a/instances/vm-{index % 5000}"
+        finding.create_time = datetime.fromtimestamp(self.create_times[index], timezone.utc)
+        finding.event_time = datetime.fromtimestamp(self.event_times[index], timezone.utc)
+        finding.state = self.states[index]
+        return finding
+
+    def _matches(self, index: int, clauses) -> bool:
+        for field, op, value in clauses:
+            if field == "state":
+                if self.states[index] != (STATE_ACTIVE if value == "ACTIVE" else STATE_INACTIVE):
+                    return False
+            elif field == "severity":
+                if self.severities[self.severity_codes[index]] != value:
+                    return False
+            elif field == "category":
+                if self.categories[self.category_codes[index]] != value:
+                    return False
+            elif field == "event_time" and op == ">=":
+                if self.event_times[index] < value:
+                    return False
+        return True
+
+    def list_findings(self, request: Dict) -> _ListFindingsPager:
+        self.list_calls += 1
+        parent = request["parent"]
+        page_size = min(request.get("page_size") or self.max_page_size, self.max_page_size)
+        compare_duration: Optional[timedelta] = request.get("compare_duration")
+        compare_since = (
+            datetime.now(timezone.utc).timestamp() - compare_duration.total_seconds()
+            if compare_duration is not None else None
+        )
+
+        # Only the simple quoted comparisons the sync generates are understood
+        clauses = []
+        named = set()
+        for field, op, value in _FILTER_CLAUSE.findall(request.get("filter", "")):
+            if field == "name":
+                finding_id = value.split("/findings/")[-1]
+                if finding_id[1:].isdigit() and int(finding_id[1:]) < self.count:
+                    named.add(int(finding_id[1:]))
+            elif field == "event_time":
+                clauses.append((field, op, _parse_time(value).timestamp()))
+            elif field in ("state", "severity", "category"):
+                clauses.append((field, op, value))
+
+        def pages() -> Iterator[_ListFindingsPage]:
+            results = []
+            for index in (sorted(named) if "name=" in request.get("filter", "") else range(self.count)):
+                if not self._matches(index, clauses):
+                    continue
+                change = "UNUSED"
+                if compare_since is not None:
+                    if self.create_times[index] >= compare_since:
+                        change = "ADDED"
+                    elif self.states[index] == STATE_INACTIVE and self.event_times[index] >= compare_since:
+                        change = "REMOVED"
+                    elif self.event_times[index] >= compare_since:
+                        change = "CHANGED"
+                    else:
+                        change = "UNCHANGED"
+                results.append(_ListFindingsResult(self._finding(index, parent), change))
+                if len(results) == page_size:
+                    self.pages_served += 1
+                    self.findings_served += len(results)
+                    yield _ListFindingsPage(results)
+                    results = []
+            if results:
+                self.pages_served += 1
+                self.findings_served += len(results)
+                yield _ListFindingsPage(results)
+
+        return _ListFindingsPager(pages())
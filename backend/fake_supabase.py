@@ -0,0 +1,295 @@
+"""
+In-memory stand-in for the parts of the Supabase/PostgREST client the sync uses.
+
+Implements table().select/insert/update/upsert/delete with the eq, neq, in_,
+gt, gte, lt, lte, or_ (eq, in and is.null conditions, optionally negated),
+order, limit and range modifiers, enforces primary keys the
+way PostgREST would (duplicate inserts fail) and counts every request. An
+optional per-request latency models network round trips, and max_rows
+mimics the server-side row cap on selects.
+"""
+import bisect
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Primary keys of the tables the sync writes; anything else is keyed on id
+PRIMARY_KEYS = {
+    "compliance_score_snapshot": ("category",),
+    "compliance_score_history": ("resolution", "bucket"),
+    "sync_state": ("key",),
+}
+
+
+class FakeAPIError(Exception):
+    """Raised where PostgREST would return an error response"""
+
+
+def _split_conditions(conditions: str) -> List[str]:
+    """Split a PostgREST or= list on the commas outside parentheses"""
+    terms, depth, start = [], 0, 0
+    for position, char in enumerate(conditions):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            terms.append(conditions[start:position])
+            start = position + 1
+    terms.append(conditions[start:])
+    return [term.strip() for term in terms if term.strip()]
+
+
+def _condition(term: str) -> Callable[[Dict[str, Any]], bool]:
+    """Build a row check from one column.operator.value condition"""
+    column, operator, value = term.split(".", 2)
+    negate = operator == "not"
+    if negate:
+        operator, value = value.split(".", 1)
+    if operator == "is" and value == "null":
+        check = lambda row: row.get(column) is None
+    elif operator == "eq":
+        check = lambda row: row.get(column) is not None and str(row[column]) == value
+    elif operator == "in":
+        values = set(_split_conditions(value.strip("()")))
+        check = lambda row: row.get(column) is not None and str(row[column]) in values
+    else:
+        raise FakeAPIError(f"unsupported operator {operator} in {term}")
+    # SQL comparisons with NULL are never true, negated or not
+    if negate and operator != "is":
+        return lambda row: row.get(column) is not None and not check(row)
+    return (lambda row: not check(row)) if negate else check
+
+
+class FakeResponse:
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    def __init__(self, client: "FakeSupabase", table: str):
+        self.client = client
+        self.table = table
+        self.operation = "select"
+        self.columns: Optional[List[str]] = None
+        self.payload: Any = None
+        self.on_conflict: Optional[Tuple[str, ...]] = None
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.equals: Dict[str, Any] = {}
+        self.lower_bounds: Dict[str, Tuple[Any, bool]] = {}
+        self.ordering: List[Tuple[str, bool]] = []
+        self.row_limit: Optional[int] = None
+        self.row_offset = 0
+
+    # Operations
+
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "FakeQuery":
+        self.operation = "select"
+        if columns.strip() != "*":
+            self.columns = [column.strip() for column in columns.split(",") if column.strip()]
+        return self
+
+    def insert(self, rows) -> "FakeQuery":
+        self.operation = "insert"
+        self.payload = rows
+        return self
+
+    def upsert(self, rows, on_conflict: Optional[str] = None, **kwargs) -> "FakeQuery":
+        self.operation = "upsert"
+        self.payload = rows
+        if on_conflict:
+            self.on_conflict = tuple(column.strip() for column in on_conflict.split(","))
+        return self
+
+    def update(self, values: Dict[str, Any]) -> "FakeQuery":
+        self.operation = "update"
+        self.payload = values
+        return self
+
+    def delete(self) -> "FakeQuery":
+        self.operation = "delete"
+        return self
+
+    # Filters and modifiers
+
+    def eq(self, column: str, value: Any) -> "FakeQuery":
+        self.equals[column] = value
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def in_(self, column: str, values: Iterable[Any]) -> "FakeQuery":
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def or_(self, conditions: str) -> "FakeQuery":
+        checks = [_condition(term) for term in _split_conditions(conditions)]
+        self.filters.append(lambda row: any(check(row) for check in checks))
+        return self
+
+    def gt(self, column: str, value: Any) -> "FakeQuery":
+        self.lower_bounds[column] = (value, False)
+        self.filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def gte(self, column: str, value: Any) -> "FakeQuery":
+        self.lower_bounds[column] = (value, True)
+        self.filters.append(lambda row: row.get(column) is not None and row[column] >= value)
+        return self
+
+    def lt(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda row: row.get(column) is not None and row[column] < value)
+        return self
+
+    def lte(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda row: row.get(column) is not None and row[column] <= value)
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "FakeQuery":
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, count: int) -> "FakeQuery":
+        self.row_limit = count
+        return self
+
+    def range(self, start: int, end: int) -> "FakeQuery":
+        self.row_offset = start
+        self.row_limit = end - start + 1
+        return self
+
+    def execute(self) -> FakeResponse:
+        return self.client._execute(self)
+
+
+class FakeSupabase:
+    """In-memory Supabase client; tables are dicts of primary key to row"""
+
+    def __init__(self, latency_ms: float = 0.0, max_rows: Optional[int] = None):
+        self.latency = latency_ms / 1000
+        self.max_rows = max_rows
+        self.tables: Dict[str, Dict[Tuple, Dict[str, Any]]] = {}
+        # Sorted primary keys per table, rebuilt lazily after inserts and deletes
+        self._indexes: Dict[str, List[Any]] = {}
+        self.requests: Counter = Counter()
+        self.rows_written = 0
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.rows_written = 0
+
+    @property
+    def request_count(self) -> int:
+        return sum(self.requests.values())
+
+    def _key(self, table: str, row: Dict[str, Any], key_columns: Optional[Tuple[str, ...]] = None) -> Tuple:
+        key_columns = key_columns or PRIMARY_KEYS.get(table, ("id",))
+        try:
+            return tuple(row[column] for column in key_columns)
+        except KeyError as e:
+            raise FakeAPIError(f"null value in column {e} of relation {table} violates not-null constraint")
+
+    def _select(self, table: Dict[Tuple, Dict[str, Any]], query: FakeQuery, capped: bool = True) -> List[Dict[str, Any]]:
+        key_columns = PRIMARY_KEYS.get(query.table, ("id",))
+        if all(column in query.equals for column in key_columns):
+            # Primary key lookups use the index instead of scanning the table
+            row = table.get(tuple(query.equals[column] for column in key_columns))
+            rows: Iterable[Dict[str, Any]] = [row] if row is not None else []
+        elif len(key_columns) == 1 and query.ordering == [(key_columns[0], False)] and query.row_limit is not None:
+            # Keyset pages walk the sorted primary key index like a btree scan
+            return self._index_scan(table, query, key_columns[0], capped)
+        else:
+            rows = table.values()
+        matched = [row for row in rows if all(check(row) for check in query.filters)]
+        for column, desc in reversed(query.ordering):
+            matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        limit = query.row_limit
+        if capped and self.max_rows is not None:
+            limit = self.max_rows if limit is None else min(limit, self.max_rows)
+        end = None if limit is None else query.row_offset + limit
+        return matched[query.row_offset:end]
+
+    def _index_scan(self, table, query: FakeQuery, column: str, capped: bool) -> List[Dict[str, Any]]:
+        index = self._indexes.get(query.table)
+        if index is None:
+            index = self._indexes[query.table] = sorted(key[0] for key in table)
+        start = 0
+        if column in query.lower_bounds:
+            value, inclusive = query.lower_bounds[column]
+            start = (bisect.bisect_left if inclusive else bisect.bisect_right)(index, value)
+
+        limit = query.row_limit
+        if capped and self.max_rows is not None:
+            limit = min(limit, self.max_rows)
+        wanted = query.row_offset + limit
+        matched = []
+        for position in range(start, len(index)):
+            row = table[(index[position],)]
+            if all(check(row) for check in query.filters):
+                matched.append(row)
+                if len(matched) == wanted:
+                    break
+        return matched[query.row_offset:]
+
+    def _execute(self, query: FakeQuery) -> FakeResponse:
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.requests[f"{query.table}.{query.operation}"] += 1
+            table = self.tables.setdefault(query.table, {})
+
+            if query.operation == "select":
+                rows = self._select(table, query)
+                if query.columns is not None:
+                    rows = [{column: row.get(column) for column in query.columns} for row in rows]
+                else:
+                    rows = [dict(row) for row in rows]
+                return FakeResponse(rows)
+
+            if query.operation in ("insert", "upsert"):
+                rows = query.payload if isinstance(query.payload, list) else [query.payload]
+                keys = [self._key(query.table, row, query.on_conflict) for row in rows]
+                if query.operation == "insert":
+                    # PostgREST inserts a batch atomically
+                    duplicates = [key for key in keys if key in table]
+                    if duplicates or len(set(keys)) != len(keys):
+                        raise FakeAPIError(f"duplicate key value violates unique constraint on {query.table}")
+                for key, row in zip(keys, rows):
+                    if query.operation == "upsert" and key in table:
+                        table[key] = {**table[key], **row}
+                    else:
+                        table[key] = dict(row)
+                        self._indexes.pop(query.table, None)
+                self.rows_written += len(rows)
+                return FakeResponse([dict(row) for row in rows])
+
+            if query.operation == "update":
+                updated = []
+                for row in self._select(table, query, capped=False):
+                    row.update(query.payload)
+                    updated.append(dict(row))
+                self.rows_written += len(updated)
+                return FakeResponse(updated)
+
+            if query.operation == "delete":
+                deleted = self._select(table, query, capped=False)
+                for row in deleted:
+                    del table[self._key(query.table, row)]
+                if deleted:
+                    self._indexes.pop(query.table, None)
+                self.rows_written += len(deleted)
+                return FakeResponse(deleted)
+
+        raise FakeAPIError(f"Unsupported operation {query.operation}")
@@ -0,0 +1,195 @@
+import base64
+import binascii
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from metrics import stage_timer
+from scoring import RESOLVED_STATUSES
+
+FINDINGS_TABLE = "security_findings"
+
+# Columns a client may request through the fields= projection
+FINDING_COLUMNS = (
+    "id",
+    "severity",
+    "category",
+    "description",
+    "resource_name",
+    "first_observed",
+    "last_observed",
+    "status",
+    "remediation_url",
+    "domain",
+)
+
+# Columns the count_findings_by RPC can group on
+GROUP_BY_COLUMNS = ("severity", "category", "status", "domain")
+
+# PostgREST condition matching open findings; a missing status counts as open, as in scoring
+OPEN_FINDINGS_CONDITION = f"status.is.null,status.not.in.({','.join(sorted(RESOLVED_STATUSES))})"
+
+FINDINGS_PAGE_SIZE_MAX = int(os.getenv("FINDINGS_PAGE_SIZE_MAX", "1000"))
+
+
+def parse_list(value: Optional[str]) -> List[str]:
+    """Split a comma-separated query parameter"""
+    if not value:
+        return []
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Validate a fields= projection, returning None when every column is wanted"""
+    requested = parse_list(fields)
+    if not requested:
+        return None
+    unknown = [field for field in requested if field not in FINDING_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # The keyset cursor is built from the id, so it is always selected
+    return list(dict.fromkeys(["id", *requested]))
+
+
+def encode_cursor(finding_id: str) -> str:
+    """Encode the last seen finding id as an opaque cursor"""
+    return base64.urlsafe_b64encode(finding_id.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> str:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        finding_id = base64.b64decode(cursor.encode("ascii"), altchars=b"-_", validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    # Non-canonical encodings (e.g. stray padding bits) are rejected too
+    if not finding_id or encode_cursor(finding_id) != cursor:
+        raise ValueError("Invalid cursor")
+    return finding_id
+
+
+def apply_filters(
+    query,
+    severity: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    domain: Optional[str] = None,
+    observed_after: Optional[datetime] = None,
+    observed_before: Optional[datetime] = None,
+    open_only: bool = False,
+):
+    """Push the findings filters down into a PostgREST query"""
+    if open_only:
+        query = query.or_(OPEN_FINDINGS_CONDITION)
+    severities = [value.upper() for value in parse_list(severity)]
+    if severities:
+        query = query.in_("severity", severities)
+    categories = parse_list(category)
+    if categories:
+        query = query.in_("category", categories)
+    statuses = parse_list(status)
+    if statuses:
+        query = query.in_("status", statuses)
+    domains = parse_list(domain)
+    if domains:
+        query = query.in_("domain", domains)
+    if observed_after:
+        query = query.gte("last_observed", observed_after.isoformat())
+    if observed_before:
+        query = query.lt("last_observed", observed_before.isoformat())
+    return query
+
+
+def fetch_findings_page(
+    supabase,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Fetch one keyset page of findings ordered by id.
+
+    Returns the rows and the cursor of the next page, or None when this was
+    the last page. Without a limit every matching row is returned, read in
+    pages so the server's max-rows cap can't truncate it.
+    """
+    if not limit:
+        rows: List[Dict[str, Any]] = []
+        while True:
+            page, cursor = fetch_findings_page(supabase, columns, filters, cursor, FINDINGS_PAGE_SIZE_MAX)
+            rows.extend(page)
+            if cursor is None:
+                return rows, None
+
+    query = supabase.table(FINDINGS_TABLE).select(",".join(columns) if columns else "*")
+    query = apply_filters(query, **(filters or {}))
+    if cursor:
+        query = query.gt("id", decode_cursor(cursor))
+    query = query.order("id").limit(limit)
+
+    with stage_timer("supabase_fetch"):
+        response = query.execute()
+
+    if hasattr(response, "error") and response.error is not None:
+        raise RuntimeError(f"Supabase error: {response.error}")
+
+    rows = response.data
+    next_cursor = encode_cursor(rows[-1]["id"]) if len(rows) == limit else None
+    return rows, next_cursor
+
+
+def fetch_all_findings(
+    supabase,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    page_size: int = FINDINGS_PAGE_SIZE_MAX,
+) -> List[Dict[str, Any]]:
+    """Fetch every matching finding in keyset pages, staying under the server's row cap"""
+    rows: List[Dict[str, Any]] = []
+    cursor = None
+    while True:
+        page, cursor = fetch_findings_page(supabase, columns, filters, cursor, page_size)
+        rows.extend(page)
+        if cursor is None:
+            return rows
+
+
+def fetch_findings_by_id(
+    supabase,
+    columns: List[str],
+    finding_ids: List[str],
+    chunk_size: int = 200,
+) -> Dict[str, Dict[str, Any]]:
+    """Fetch specific findings by id, in chunks that keep the request URL short"""
+    found: Dict[str, Dict[str, Any]] = {}
+    for start in range(0, len(finding_ids), chunk_size):
+        with stage_timer("supabase_fetch"):
+            response = (
+                supabase.table(FINDINGS_TABLE)
+                .select(",".join(columns))
+                .in_("id", finding_ids[start:start + chunk_size])
+                .execute()
+            )
+        if hasattr(response, "error") and response.error is not None:
+            raise RuntimeError(f"Supabase error: {response.error}")
+        for row in response.data:
+            found[row["id"]] = row
+    return found
+
+
+def count_findings_by(supabase, column: str, open_only: bool = True) -> Dict[str, int]:
+    """
+    Count findings grouped by a column using the count_findings_by RPC, so
+    only the aggregate rows come back from the database. Resolved findings
+    are left out unless open_only is False.
+    """
+    if column not in GROUP_BY_COLUMNS:
+        raise ValueError(f"Cannot group findings by {column}")
+
+    with stage_timer("supabase_aggregate"):
+        response = supabase.rpc("count_findings_by", {"group_column": column, "open_only": open_only}).execute()
+
+    if hasattr(response, "error") and response.error is not None:
+        raise RuntimeError(f"Supabase error: {response.error}")
+
+    return {(row["value"] or "UNKNOWN"): int(row["count"]) for row in response.data}
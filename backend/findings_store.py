@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+from findings_query import FINDINGS_PAGE_SIZE_MAX, fetch_findings_page, parse_list
+from metrics import record_cache_lookups, stage_timer
+from scoring import counts_toward_score
+
+# How long a snapshot is served before it is reloaded even without a version change
+FINDINGS_SNAPSHOT_TTL_SECONDS = float(os.getenv("FINDINGS_SNAPSHOT_TTL_SECONDS", "300"))
+
+INDEXED_COLUMNS = ("severity", "category", "status", "domain", "resource_type")
+
+# Filters selecting the findings that still count against the score
+OPEN_FINDINGS = {"open_only": True}
+
+
+def resource_type(resource_name: Optional[str]) -> str:
+    """Classify a GCP resource name the same way remediation URLs are chosen"""
+    resource = resource_name or ""
+    if "compute.googleapis.com" in resource:
+        return "compute"
+    elif "storage.googleapis.com" in resource:
+        return "storage"
+    elif "iam" in resource.lower():
+        return "iam"
+    else:
+        return "other"
+
+
+def _as_utc(value) -> Optional[datetime]:
+    """Parse a timestamp into an aware UTC datetime"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class FindingsSnapshot:
+    """Immutable in-memory copy of the findings table with secondary indexes"""
+
+    def __init__(self, rows: List[Dict[str, Any]], version: Optional[str]):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.rows = {row["id"]: row for row in rows}
+        self.ids = sorted(self.rows)
+        self.indexes: Dict[str, Dict[Any, Set[str]]] = {column: defaultdict(set) for column in INDEXED_COLUMNS}
+
+        self.resource_types: Dict[str, str] = {}
+        # Findings still counting against the score, selected by the open_only filter
+        self.open_ids = {finding_id for finding_id, row in self.rows.items() if counts_toward_score(row)}
+
+        observed = []
+        for row in self.rows.values():
+            self.resource_types[row["id"]] = resource_type(row.get("resource_name"))
+            for column in INDEXED_COLUMNS:
+                value = self.resource_types[row["id"]] if column == "resource_type" else row.get(column)
+                self.indexes[column][value].add(row["id"])
+            observed_at = _as_utc(row.get("last_observed"))
+            if observed_at is not None:
+                observed.append((observed_at, row["id"]))
+
+        # Sorted by last_observed so time ranges are a pair of bisects
+        observed.sort()
+        self._observed_times = [observed_at for observed_at, _ in observed]
+        self._observed_ids = [finding_id for _, finding_id in observed]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def lookup(self, column: str, values: List[Any]) -> Set[str]:
+        """Ids of findings whose column matches any of the values"""
+        index = self.indexes[column]
+        matched: Set[str] = set()
+        for value in values:
+            matched |= index.get(value, set())
+        return matched
+
+    def select_ids(self, filters: Optional[Dict[str, Any]] = None) -> Optional[Set[str]]:
+        """
+        Resolve the findings filters through the indexes.
+
+        Returns the matching ids, or None when no filter applies.
+        """
+        filters = filters or {}
+        selected: Optional[Set[str]] = None
+
+        def narrow(ids: Set[str]) -> None:
+            nonlocal selected
+            selected = ids if selected is None else selected & ids
+
+        if filters.get("open_only"):
+            narrow(self.open_ids)
+        severities = [value.upper() for value in parse_list(filters.get("severity"))]
+        if severities:
+            narrow(self.lookup("severity", severities))
+        for column in ("category", "status", "domain", "resource_type"):
+            values = parse_list(filters.get(column))
+            if values:
+                narrow(self.lookup(column, values))
+
+        observed_after = _as_utc(filters.get("observed_after"))
+        observed_before = _as_utc(filters.get("observed_before"))
+        if observed_after or observed_before:
+            start = bisect_left(self._observed_times, observed_after) if observed_after else 0
+            end = bisect_left(self._observed_times, observed_before) if observed_before else len(self._observed_times)
+            narrow(set(self._observed_ids[start:end]))
+
+        return selected
+
+    def page(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        after_id: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Return one keyset page of matching findings ordered by id, as copies
+        that callers may enrich, and the id to continue after.
+        """
+        selected = self.select_ids(filters)
+        # Walk the sorted ids from the cursor, so paging through a filtered
+        # result touches each id once instead of re-sorting the matches per page
+        rows: List[Dict[str, Any]] = []
+        for position in range(bisect_right(self.ids, after_id) if after_id else 0, len(self.ids)):
+            finding_id = self.ids[position]
+            if selected is not None and finding_id not in selected:
+                continue
+            rows.append(dict(self.rows[finding_id]))
+            if limit and len(rows) == limit:
+                return rows, finding_id
+        return rows, None
+
+    def count_by(self, column: str, filters: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """Count findings per value of an indexed column"""
+        selected = self.select_ids(filters)
+        counts = {}
+        for value, ids in self.indexes[column].items():
+            count = len(ids) if selected is None else len(ids & selected)
+            if count:
+                key = value or "UNKNOWN"
+                counts[key] = counts.get(key, 0) + count
+        return counts
+
+
+class FindingsStore:
+    """
+    Holds the current FindingsSnapshot, reloading it when the dataset version
+    changes or the TTL expires.
+    """
+
+    def __init__(self, supabase, version_tracker=None, ttl_seconds: float = FINDINGS_SNAPSHOT_TTL_SECONDS):
+        self.supabase = supabase
+        self.version_tracker = version_tracker
+        self.ttl_seconds = ttl_seconds
+        self.loads = 0
+        self._snapshot: Optional[FindingsSnapshot] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> FindingsSnapshot:
+        """Return a fresh snapshot, loading one if needed"""
+        version = self.version_tracker.current() if self.version_tracker else None
+        with self._lock:
+            snapshot = self._snapshot
+            if (
+                snapshot is None
+                or time.monotonic() - snapshot.built_at >= self.ttl_seconds
+                or (version is not None and version != snapshot.version)
+            ):
+                record_cache_lookups("findings_snapshot", 0, 1)
+                with stage_timer("snapshot_load"):
+                    self._snapshot = self._load(version)
+            else:
+                record_cache_lookups("findings_snapshot", 1, 0)
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
+    def _load(self, version: Optional[str]) -> FindingsSnapshot:
+        started = time.perf_counter()
+        rows: List[Dict[str, Any]] = []
+        cursor = None
+        while True:
+            page, cursor = fetch_findings_page(self.supabase, cursor=cursor, limit=FINDINGS_PAGE_SIZE_MAX)
+            rows.extend(page)
+            if cursor is None:
+                break
+
+        self.loads += 1
+        snapshot = FindingsSnapshot(rows, version)
+        print(f"Loaded findings snapshot of {len(snapshot)} findings in {time.perf_counter() - started:.2f}s")
+        return snapshot
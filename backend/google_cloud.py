@@ -1,101 +1,303 @@
 import os
 import json
+from google.auth.transport.requests import Request as GoogleAuthRequest
 from google.cloud import securitycenter
 from google.cloud.securitycenter_v1 import Finding
-from datetime import datetime, timedelta
+from google.oauth2 import service_account
+from datetime import datetime, timedelta, timezone
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Bounded worker pool for listing parent/filter shards concurrently
+SCC_FETCH_CONCURRENCY = int(os.getenv("SCC_FETCH_CONCURRENCY", "4"))
+
+# Findings per list_findings page (SCC allows up to 1000) and pages buffered ahead of the consumer
+SCC_PAGE_SIZE = int(os.getenv("SCC_PAGE_SIZE", "1000"))
+SCC_FETCH_QUEUE_PAGES = int(os.getenv("SCC_FETCH_QUEUE_PAGES", "4"))
+
+_SHARD_DONE = object()
+
+CLOUD_PLATFORM_SCOPE = "https://www.googleapis.com/auth/cloud-platform"
+
+SEVERITY_SHARDS = ("CRITICAL", "HIGH", "MEDIUM", "LOW", "SEVERITY_UNSPECIFIED")
+
+def service_account_info() -> Optional[Dict[str, Any]]:
+    """Read the service account key from GOOGLE_CREDENTIALS or its individual components"""
+    if os.getenv("GOOGLE_CREDENTIALS"):
+        return json.loads(os.getenv("GOOGLE_CREDENTIALS"))
+    if os.getenv("GOOGLE_PRIVATE_KEY") and os.getenv("GOOGLE_CLIENT_EMAIL"):
+        return {
+            "type": "service_account",
+            "project_id": os.getenv("GOOGLE_PROJECT_ID"),
+            "private_key": os.getenv("GOOGLE_PRIVATE_KEY").replace("\\n", "\n"),
+            "client_email": os.getenv("GOOGLE_CLIENT_EMAIL"),
+            "token_uri": "https://oauth2.googleapis.com/token"
+        }
+    return None
 
 def authenticate_google_cloud():
     """Set up Google Cloud authentication"""
     try:
-        # Check if credentials exist in environment
-        if os.getenv("GOOGLE_CREDENTIALS"):
-            # Write credentials to a temporary file
-            credentials_path = "/tmp/google-credentials.json"
-            with open(credentials_path, "w") as f:
-                f.write(os.getenv("GOOGLE_CREDENTIALS"))
-            
-            # Set environment variable to point to credentials file
-            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
-            return True
-        elif os.getenv("GOOGLE_PRIVATE_KEY") and os.getenv("GOOGLE_CLIENT_EMAIL"):
-            # Create credentials JSON from individual components
-            credentials = {
-                "type": "service_account",
-                "project_id": os.getenv("GOOGLE_PROJECT_ID"),
-                "private_key": os.getenv("GOOGLE_PRIVATE_KEY").replace("\\n", "\n"),
-                "client_email": os.getenv("GOOGLE_CLIENT_EMAIL"),
-                "token_uri": "https://oauth2.googleapis.com/token"
-            }
-            
-            # Write credentials to a temporary file
-            credentials_path = "/tmp/google-credentials.json"
-            with open(credentials_path, "w") as f:
-                json.dump(credentials, f)
-            
-            # Set environment variable to point to credentials file
-            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
-            return True
-        else:
+        credentials = service_account_info()
+        if credentials is None:
             print("No Google credentials found in environment variables")
             return False
+        
+        # Write credentials to a temporary file
+        credentials_path = "/tmp/google-credentials.json"
+        with open(credentials_path, "w") as f:
+            json.dump(credentials, f)
+        
+        # Set environment variable to point to credentials file
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
+        return True
     except Exception as e:
         print(f"Error setting up Google Cloud authentication: {e}")
         return False
 
-def fetch_security_findings():
-    """Fetch security findings from Google Cloud Security Command Center"""
-    try:
-        # Authenticate with Google Cloud
-        if not authenticate_google_cloud():
-            return []
-        
-        # Initialize Security Command Center client
-        client = securitycenter.SecurityCenterClient()
-        
-        # Get organization ID from environment variables
-        org_id = os.getenv("GOOGLE_ORGANIZATION_ID")
-        if not org_id:
-            print("No organization ID found in environment variables")
-            return []
-        
-        # Format the organization resource name
-        org_name = f"organizations/{org_id}"
-        
+class SccSession:
+    """
+    A Security Command Center client built once from in-memory credentials
+    and reused across sync cycles, so its gRPC channel stays open.
+    """
+    
+    def __init__(self):
+        info = service_account_info()
+        if info is None:
+            raise RuntimeError("No Google credentials found in environment variables")
+        self.credentials = service_account.Credentials.from_service_account_info(
+            info, scopes=[CLOUD_PLATFORM_SCOPE]
+        )
+        self.client = securitycenter.SecurityCenterClient(credentials=self.credentials)
+        self.refreshes = 0
+    
+    def ensure_fresh(self) -> bool:
+        """Refresh the access token only when it is missing or expired; returns whether it did"""
+        if self.credentials.valid:
+            return False
+        self.credentials.refresh(GoogleAuthRequest())
+        self.refreshes += 1
+        return True
+
+def process_finding(finding: Finding) -> Dict[str, Any]:
+    """Extract the fields stored in Supabase from an SCC finding"""
+    return {
+        "id": finding.name.split("/")[-1],
+        "category": finding.category,
+        "severity": Finding.Severity(finding.severity).name,
+        "description": finding.description or "",
+        "resource_name": finding.resource_name,
+        "first_observed": finding.create_time.isoformat(),
+        "last_observed": finding.event_time.isoformat(),
+        "status": Finding.State(finding.state).name if finding.state else "ACTIVE"
+    }
+
+def scc_parents() -> List[str]:
+    """
+    Parents to fetch findings from: GOOGLE_SCC_PARENTS (comma-separated
+    organizations/, folders/ or projects/ names), or GOOGLE_ORGANIZATION_ID
+    """
+    parents = [parent.strip() for parent in os.getenv("GOOGLE_SCC_PARENTS", "").split(",") if parent.strip()]
+    if not parents and os.getenv("GOOGLE_ORGANIZATION_ID"):
+        parents = [f"organizations/{os.getenv('GOOGLE_ORGANIZATION_ID')}"]
+    # Findings are listed per source; "-" covers every source under the parent
+    return [parent if "/sources/" in parent else f"{parent}/sources/-" for parent in parents]
+
+def scc_shards() -> List[Optional[str]]:
+    """
+    Extra filter clauses that split each parent's listing into shards
+    (SCC_FETCH_SHARDS, semicolon-separated). "severity" shards by every severity.
+    """
+    value = os.getenv("SCC_FETCH_SHARDS", "").strip()
+    if value.lower() == "severity":
+        return [f"severity=\"{severity}\"" for severity in SEVERITY_SHARDS]
+    shards = [shard.strip() for shard in value.split(";") if shard.strip()]
+    return shards or [None]
+
+def full_sync_window_start() -> datetime:
+    """Earliest creation time listed by a full reconciliation"""
+    lookback_days = int(os.getenv("FINDINGS_LOOKBACK_DAYS", "30"))
+    return datetime.now(timezone.utc) - timedelta(days=lookback_days)
+
+def _scc_request(since: Optional[datetime]):
+    """Build the base filter and compare duration for a full or incremental listing"""
+    if since is None:
         # Calculate the time range for findings
-        lookback_days = int(os.getenv("FINDINGS_LOOKBACK_DAYS", "30"))
-        start_time = datetime.now() - timedelta(days=lookback_days)
+        start_time = full_sync_window_start()
         
         # Create filter for active findings
-        filter_str = f"state=\"ACTIVE\" AND createTime>=\"{start_time.isoformat()}Z\""
-        
-        # List findings
-        findings_iterator = client.list_findings(
-            request={
-                "parent": org_name,
-                "filter": filter_str,
-            }
-        )
-        
-        # Process findings
-        processed_findings = []
-        for finding_result in findings_iterator:
-            finding = finding_result.finding
-            
-            # Extract relevant information
-            processed_finding = {
-                "id": finding.name.split("/")[-1],
-                "category": finding.category,
-                "severity": finding.severity,
-                "description": finding.description or "",
-                "resource_name": finding.resource_name,
-                "first_observed": finding.create_time.isoformat(),
-                "last_observed": finding.event_time.isoformat(),
-                "status": "ACTIVE"
-            }
-            
-            processed_findings.append(processed_finding)
+        return f"state=\"ACTIVE\" AND createTime>=\"{start_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')}\"", None
+    
+    # Only findings that changed since the watermark, annotated with their
+    # state change over the same window
+    since = since.astimezone(timezone.utc)
+    return (
+        f"event_time>=\"{since.strftime('%Y-%m-%dT%H:%M:%S.%fZ')}\"",
+        datetime.now(timezone.utc) - since,
+    )
+
+def _named_requests(finding_names: List[str], chunk_size: int = 50) -> List[Tuple[str, str]]:
+    """List the named findings from their own sources, a chunk of names per filter"""
+    by_source: Dict[str, List[str]] = {}
+    for name in finding_names:
+        by_source.setdefault(name.split("/findings/")[0], []).append(name)
+    return [
+        (source, " OR ".join(f"name=\"{name}\"" for name in names[start:start + chunk_size]))
+        for source, names in by_source.items()
+        for start in range(0, len(names), chunk_size)
+    ]
+
+def iter_security_findings(
+    since: Optional[datetime] = None,
+    parents: Optional[List[str]] = None,
+    shards: Optional[List[Optional[str]]] = None,
+    page_size: int = SCC_PAGE_SIZE,
+    client=None,
+    listing: Optional[Dict[str, Any]] = None,
+    finding_names: Optional[List[str]] = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield security findings from Security Command Center one page at a time.
+
+    Without since, lists every ACTIVE finding created in the last
+    FINDINGS_LOOKBACK_DAYS (a full reconciliation). With since, lists only
+    findings whose event time is at or after it, in any state, so findings
+    that became inactive are picked up too.
+
+    Every parent/shard pair is listed concurrently on up to
+    SCC_FETCH_CONCURRENCY threads. Pages pass through a queue of at most
+    SCC_FETCH_QUEUE_PAGES, so listing pauses while the consumer catches up.
+    A finding listed by several shards is only yielded the first time, so
+    two copies never race each other into the table. When a skipped copy
+    was newer, its last_observed is recorded in listing["deferred_since"]
+    so the caller can keep its watermark at or before it and pick the newer
+    state up on the next incremental run. Errors are raised to the caller.
+
+    finding_names (full SCC finding names) lists just those findings, in any
+    state, from their own sources; since, parents and shards are then ignored.
+
+    Pass a long-lived client (see SccSession) to skip authentication.
+    """
+    if client is None:
+        # Authenticate with Google Cloud
+        if not authenticate_google_cloud():
+            raise RuntimeError("Google Cloud authentication is not configured")
         
-        return processed_findings
+        # Initialize Security Command Center client, shared by every shard
+        client = securitycenter.SecurityCenterClient()
+    
+    if finding_names is not None:
+        since, compare_duration = None, None
+        tasks = _named_requests(finding_names)
+    else:
+        parents = parents or scc_parents()
+        if not parents:
+            raise RuntimeError("No organization ID or SCC parents found in environment variables")
+        shards = shards or scc_shards()
+        base_filter, compare_duration = _scc_request(since)
+        tasks = [
+            (parent, base_filter if shard is None else f"{base_filter} AND ({shard})")
+            for parent in parents
+            for shard in shards
+        ]
+    
+    pages: "queue.Queue" = queue.Queue(maxsize=SCC_FETCH_QUEUE_PAGES)
+    stop = threading.Event()
+    
+    def put(item) -> bool:
+        # Block while the queue is full, giving up once the consumer has gone away
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def list_shard(parent: str, filter_str: str) -> None:
+        if stop.is_set():
+            return
+        try:
+            request = {"parent": parent, "filter": filter_str, "page_size": page_size}
+            if compare_duration is not None:
+                request["compare_duration"] = compare_duration
+            for page in client.list_findings(request=request).pages:
+                if stop.is_set():
+                    return
+                results = page.list_findings_results
+                changes = {}
+                if compare_duration is not None:
+                    for result in results:
+                        change = result.state_change.name
+                        changes[change] = changes.get(change, 0) + 1
+                if not put(([process_finding(result.finding) for result in results], changes)):
+                    return
+            put(_SHARD_DONE)
+        except Exception as e:
+            put(e)
+    
+    # Only IDs and event times are kept to deduplicate overlapping parents
+    seen: Dict[str, str] = {}
+    deferred_since: Optional[str] = None
+    state_changes = {}
+    fetched = 0
+    duplicates = 0
+    workers = max(1, min(SCC_FETCH_CONCURRENCY, len(tasks)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scc-fetch") as pool:
+        for parent, filter_str in tasks:
+            pool.submit(list_shard, parent, filter_str)
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = pages.get()
+                if item is _SHARD_DONE:
+                    remaining -= 1
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                
+                findings, changes = item
+                page = []
+                for finding in findings:
+                    previous = seen.get(finding["id"])
+                    if previous is not None:
+                        duplicates += 1
+                        if finding["last_observed"] > previous and (
+                            deferred_since is None or finding["last_observed"] < deferred_since
+                        ):
+                            deferred_since = finding["last_observed"]
+                        continue
+                    seen[finding["id"]] = finding["last_observed"]
+                    page.append(finding)
+                for change, count in changes.items():
+                    state_changes[change] = state_changes.get(change, 0) + count
+                if page:
+                    fetched += len(page)
+                    yield page
+        finally:
+            # Release producers blocked on a full queue if the consumer stops early
+            stop.set()
+    
+    if listing is not None:
+        listing.update(fetched=fetched, duplicates=duplicates, deferred_since=deferred_since)
+    print(f"Fetched {fetched} findings from {len(tasks)} shards ({duplicates} duplicates)")
+    if state_changes:
+        print(f"Findings changed since {since.isoformat()}: {state_changes}")
+
+def fetch_security_findings(
+    since: Optional[datetime] = None,
+    parents: Optional[List[str]] = None,
+    shards: Optional[List[Optional[str]]] = None,
+):
+    """Fetch security findings from Google Cloud Security Command Center into one list"""
+    try:
+        processed_findings: Dict[str, Dict[str, Any]] = {}
+        for page in iter_security_findings(since, parents, shards):
+            for finding in page:
+                processed_findings[finding["id"]] = finding
+        return list(processed_findings.values())
     
     except Exception as e:
         print(f"Error fetching security findings: {e}")
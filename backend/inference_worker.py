@@ -0,0 +1,222 @@
+"""
+Local model-serving worker shared by every API worker process.
+
+The worker loads the classifier and severity pipelines once and serves them
+over a local socket. Concurrent requests for the same model are coalesced
+into micro-batches, flushed when INFERENCE_WORKER_MAX_BATCH texts are queued
+or INFERENCE_WORKER_MAX_WAIT_MS has passed since the first one arrived.
+
+    INFERENCE_WORKER_ADDRESS=127.0.0.1:8765 INFERENCE_WORKER_AUTHKEY=... python inference_worker.py
+
+API processes started with the same two variables send their inference here
+instead of loading their own copy of the models.
+"""
+import os
+import queue
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from dotenv import load_dotenv
+
+INFERENCE_WORKER_MAX_BATCH = int(os.getenv("INFERENCE_WORKER_MAX_BATCH", "64"))
+INFERENCE_WORKER_MAX_WAIT_MS = float(os.getenv("INFERENCE_WORKER_MAX_WAIT_MS", "10"))
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """Turn "host:port" into a TCP address; anything else is a Unix socket path"""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+def worker_authkey() -> bytes:
+    # Messages are pickled, so the worker must never accept unauthenticated peers
+    authkey = os.getenv("INFERENCE_WORKER_AUTHKEY")
+    if not authkey:
+        raise ValueError("INFERENCE_WORKER_AUTHKEY must be set to use the inference worker")
+    return authkey.encode("utf-8")
+
+
+class _PendingRequest:
+    def __init__(self, texts: List[str], truncation: bool):
+        self.texts = texts
+        self.truncation = truncation
+        self.results: Optional[List[Optional[Dict[str, Any]]]] = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests for one pipeline into micro-batches"""
+
+    def __init__(self, model, label: str, max_batch: int = INFERENCE_WORKER_MAX_BATCH,
+                 max_wait_ms: float = INFERENCE_WORKER_MAX_WAIT_MS):
+        self.model = model
+        self.label = label
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+        self._queue: "queue.Queue[_PendingRequest]" = queue.Queue()
+        threading.Thread(target=self._run, name=f"batcher-{label}", daemon=True).start()
+
+    def submit(self, texts: List[str], truncation: bool) -> List[Optional[Dict[str, Any]]]:
+        """Queue texts for the next micro-batch and wait for their results"""
+        request = _PendingRequest(texts, truncation)
+        self._queue.put(request)
+        request.done.wait()
+        return request.results
+
+    def _collect(self) -> List[_PendingRequest]:
+        # Block for the first request, then gather more until full or the deadline passes
+        pending = [self._queue.get()]
+        size = len(pending[0].texts)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(request)
+            size += len(request.texts)
+        return pending
+
+    def _run(self) -> None:
+        from enrichment import run_pipeline_batched
+
+        while True:
+            pending = self._collect()
+            for truncation in {request.truncation for request in pending}:
+                group = [request for request in pending if request.truncation == truncation]
+                texts = [text for request in group for text in request.texts]
+                try:
+                    results, _ = run_pipeline_batched(
+                        self.model, texts, self.label, self.max_batch, truncation
+                    )
+                except Exception as e:
+                    print(f"Error in {self.label} micro-batch: {e}")
+                    results = [None] * len(texts)
+
+                self.batches += 1
+                self.items += len(texts)
+                offset = 0
+                for request in group:
+                    request.results = results[offset:offset + len(request.texts)]
+                    offset += len(request.texts)
+                    request.done.set()
+
+
+class InferenceWorker:
+    """Serves the enrichment pipelines to local API processes"""
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self.batchers: Dict[str, MicroBatcher] = {}
+
+    def load(self, hf_token: Optional[str]) -> bool:
+        """Load the pipelines; on failure the error is kept for status() to report"""
+        from enrichment import get_models, load_local_models
+
+        if not load_local_models(hf_token):
+            return False
+        classifier, severity_model = get_models()
+        self.batchers = {
+            "classifier": MicroBatcher(classifier, "classifier"),
+            "severity": MicroBatcher(severity_model, "severity"),
+        }
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        from enrichment import model_status
+
+        return {
+            **model_status(),
+            "batches": {label: batcher.batches for label, batcher in self.batchers.items()},
+            "items": {label: batcher.items for label, batcher in self.batchers.items()},
+        }
+
+    def _serve_connection(self, connection) -> None:
+        with connection:
+            while True:
+                try:
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if message[0] == "infer":
+                        _, label, texts, truncation = message
+                        if label not in self.batchers:
+                            raise ValueError(f"Model {label} is not loaded")
+                        connection.send(("ok", self.batchers[label].submit(list(texts), truncation)))
+                    elif message[0] == "status":
+                        connection.send(("ok", self.status()))
+                    else:
+                        raise ValueError(f"Unknown request {message[0]}")
+                except (EOFError, OSError):
+                    return
+                except Exception as e:
+                    connection.send(("error", str(e)))
+
+    def serve_forever(self) -> None:
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"Inference worker listening on {self.address}")
+            while True:
+                try:
+                    connection = listener.accept()
+                except Exception as e:
+                    # Failed handshakes (e.g. a wrong authkey) only drop that peer
+                    print(f"Rejected inference worker connection: {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(connection,), daemon=True).start()
+
+
+class InferenceWorkerClient:
+    """Thread-safe client; each thread keeps its own connection to the worker"""
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self._local = threading.local()
+
+    def call(self, *message) -> Any:
+        connection = getattr(self._local, "connection", None)
+        try:
+            if connection is None:
+                connection = self._local.connection = Client(self.address, authkey=self.authkey)
+            connection.send(message)
+            status, payload = connection.recv()
+        except (EOFError, OSError):
+            # Reconnect on the next call, e.g. after the worker restarts
+            self._local.connection = None
+            raise
+        if status != "ok":
+            raise RuntimeError(f"Inference worker error: {payload}")
+        return payload
+
+
+class RemotePipeline:
+    """Callable stand-in for a text-classification pipeline served by the worker"""
+
+    def __init__(self, client: InferenceWorkerClient, label: str):
+        self.client = client
+        self.label = label
+
+    def __call__(self, inputs, batch_size: Optional[int] = None, truncation: bool = True, **kwargs):
+        if isinstance(inputs, str):
+            # Match the pipeline's single-input shape: a list holding the top result
+            return self.client.call("infer", self.label, [inputs], truncation)
+        return self.client.call("infer", self.label, list(inputs), truncation)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    worker = InferenceWorker(os.getenv("INFERENCE_WORKER_ADDRESS", "127.0.0.1:8765"), worker_authkey())
+    # A failed load is still served, so API processes see the error and stop waiting
+    worker.load(os.getenv("HF_TOKEN"))
+    worker.serve_forever()
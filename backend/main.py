@@ -1,14 +1,44 @@
 import os
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.routing import Match
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from supabase.lib.client_options import ClientOptions
-from transformers import pipeline
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 import json
+import time
+from enrichment import (
+    enrich_findings,
+    get_models,
+    model_status,
+    models_ready,
+    start_model_warmup,
+)
+from enrichment_cache import get_enrichment_cache
+from compliance_snapshot import load_snapshot
+from score_history import HISTORY_RESOLUTIONS, fetch_score_history, pick_resolution
+from scoring import ScoreArrays, aggregate_arrays, build_score_arrays, scores_from_aggregates
+from executors import run_inference, run_io, shutdown_executors
+from metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT, render_metrics, stage_timer
+from dataset_version import DatasetVersionTracker
+from response_cache import CachedResponse, ResponseCache, etag_matches
+from findings_query import (
+    FINDINGS_PAGE_SIZE_MAX,
+    count_findings_by,
+    decode_cursor,
+    encode_cursor,
+    fetch_all_findings,
+    fetch_findings_page,
+    parse_fields,
+)
+from findings_store import FindingsSnapshot, FindingsStore, resource_type
+
+_process_started = time.perf_counter()
 
 # Load environment variables
 load_dotenv()
@@ -16,6 +46,91 @@ load_dotenv()
 # Initialize FastAPI app
 app = FastAPI(title="Security Findings Dashboard API")
 
+# Responses that are cached per dataset version and served with ETags
+CACHED_PATHS = {
+    "/findings",
+    "/compliance-score",
+    "/findings/by-severity",
+    "/findings/by-category",
+    "/findings/by-status",
+    "/findings/by-domain",
+}
+
+response_cache = ResponseCache()
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+FINDINGS_STREAM_PAGE_SIZE = int(os.getenv("FINDINGS_STREAM_PAGE_SIZE", "500"))
+
+@app.middleware("http")
+async def dataset_versioned_cache(request: Request, call_next):
+    if request.method != "GET" or request.url.path not in CACHED_PATHS:
+        return await call_next(request)
+    # Streamed exports are never buffered into the cache
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return await call_next(request)
+    
+    version = await run_io(dataset_version.current)
+    if version is None:
+        return await call_next(request)
+    
+    # Enriched and un-enriched responses differ, so warm-up state is part of the key
+    key = (
+        request.url.path,
+        tuple(sorted(request.query_params.multi_items())),
+        request.headers.get("accept", ""),
+        models_ready(),
+    )
+    
+    entry = response_cache.get(key, version)
+    if entry is None:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name.lower() != "content-length"
+        }
+        entry = CachedResponse(version, body, response.status_code, headers)
+        response_cache.put(key, entry)
+    
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers={"ETag": entry.etag})
+    return Response(
+        content=entry.body,
+        status_code=entry.status_code,
+        headers={**entry.headers, "ETag": entry.etag},
+    )
+
+def route_template(request: Request) -> str:
+    """
+    Route template of a request. Responses served from the cache never reach
+    the router, so the route is matched against the app's routes for them.
+    """
+    route = request.scope.get("route")
+    if route is None:
+        for candidate in app.routes:
+            if candidate.matches(request.scope)[0] == Match.FULL:
+                route = candidate
+                break
+    return route.path if route else "unmatched"
+
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    REQUESTS_IN_FLIGHT.labels("api").inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template so path parameters don't explode cardinality
+        REQUEST_LATENCY.labels(
+            "api", request.method, route_template(request), str(status)
+        ).observe(time.perf_counter() - started)
+        REQUESTS_IN_FLIGHT.labels("api").dec()
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -23,6 +138,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Models-Warm", "ETag"],
 )
 
 # Initialize Supabase client
@@ -31,35 +147,24 @@ supabase_key = os.getenv("SUPABASE_KEY")
 options = ClientOptions(schema="public")
 supabase: Client = create_client(supabase_url, supabase_key, options=options)
 
-# Initialize HuggingFace transformer
-model_name = os.getenv("MODEL_NAME", "gpt2")
+# Changes whenever a sync or domain mapping run writes to the findings table
+dataset_version = DatasetVersionTracker(supabase)
+
+# Shared in-memory findings snapshot with secondary indexes
+FINDINGS_SNAPSHOT_ENABLED = os.getenv("FINDINGS_SNAPSHOT_ENABLED", "true").lower() == "true"
+findings_store = FindingsStore(supabase, dataset_version)
+
+# HuggingFace models are loaded in the background once the app starts
 hf_token = os.getenv("HF_TOKEN")
 
-# Add after the existing imports
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
-import numpy as np
+@app.on_event("startup")
+async def warm_up_models():
+    print(f"API ready to serve {time.perf_counter() - _process_started:.2f}s after import, warming up models")
+    start_model_warmup(hf_token)
 
-# Enhanced model initialization
-try:
-    # Use a security-specific model for better analysis
-    model_name = os.getenv("MODEL_NAME", "microsoft/DialoGPT-medium")
-    
-    # Initialize both classification and severity assessment models
-    classifier = pipeline("text-classification", 
-                         model="unitary/toxic-bert",  # Better for security content
-                         token=hf_token)
-    
-    # Add severity assessment model
-    severity_model = pipeline("text-classification",
-                             model="cardiffnlp/twitter-roberta-base-sentiment-latest",
-                             token=hf_token)
-    
-    print("HuggingFace models loaded successfully")
-except Exception as e:
-    print(f"Error loading HuggingFace models: {e}")
-    classifier = None
-    severity_model = None
+@app.on_event("shutdown")
+async def stop_executors():
+    shutdown_executors()
 
 class Finding(BaseModel):
     id: str
@@ -77,177 +182,242 @@ class ComplianceScore(BaseModel):
     category_scores: Dict[str, float]
     last_updated: str
 
+class ScoreHistoryPoint(BaseModel):
+    timestamp: str
+    overall_score: float
+    overall_min: float
+    overall_max: float
+    category_scores: Dict[str, float]
+    severity_counts: Dict[str, int]
+    samples: int
+
+class ScoreHistory(BaseModel):
+    resolution: str
+    start: str
+    end: str
+    points: List[ScoreHistoryPoint]
+
+class SimulationRequest(BaseModel):
+    remediated_ids: List[str]
+
+class SimulationResult(BaseModel):
+    current: ComplianceScore
+    simulated: ComplianceScore
+    remediated_count: int
+
 @app.get("/")
 async def root():
     return {"message": "Security Findings Dashboard API"}
 
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/ready")
+async def ready(strict: bool = False):
+    # Serving starts immediately; models_warm flips once warm-up finishes
+    warm = models_ready()
+    body = {"serving": True, "models_warm": warm, "models": model_status()}
+    if strict and not warm:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+# GCP Console pages to remediate each resource type
+REMEDIATION_PAGES = {
+    "compute": "compute/instances",
+    "storage": "storage/browser",
+    "iam": "iam-admin/iam",
+    "other": "security/command-center/findings",
+}
+
+def add_remediation_urls(findings: List[Dict[str, Any]], snapshot: Optional[FindingsSnapshot] = None) -> None:
+    """Attach a GCP Console remediation URL to each finding with a resource"""
+    project_id = os.getenv("GOOGLE_PROJECT_ID")
+    for finding in findings:
+        if "resource_name" in finding and finding["resource_name"]:
+            # Construct GCP Console URL based on resource type
+            if snapshot is not None and finding.get("id") in snapshot.resource_types:
+                kind = snapshot.resource_types[finding["id"]]
+            else:
+                kind = resource_type(finding["resource_name"])
+            finding["remediation_url"] = f"https://console.cloud.google.com/{REMEDIATION_PAGES[kind]}?project={project_id}"
+
+def findings_columns(fields: Optional[str] = None) -> Optional[List[str]]:
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def findings_cursor(cursor: Optional[str] = None) -> Optional[str]:
+    try:
+        if cursor:
+            decode_cursor(cursor)
+        return cursor
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def findings_filters(
+    severity: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    domain: Optional[str] = None,
+    observed_after: Optional[datetime] = None,
+    observed_before: Optional[datetime] = None,
+    include_resolved: bool = False,
+) -> Dict[str, Any]:
+    return {
+        "severity": severity,
+        "category": category,
+        "status": status,
+        "domain": domain,
+        "observed_after": observed_after,
+        "observed_before": observed_before,
+        # Resolved findings stay in the table until archived; asking for a status includes them
+        "open_only": not (include_resolved or status),
+    }
+
+async def load_findings_page(
+    columns: Optional[List[str]],
+    filters: Dict[str, Any],
+    cursor: Optional[str],
+    limit: Optional[int],
+):
+    """Fetch, enrich and add remediation URLs to one page of findings"""
+    # Remediation URLs are derived from the resource name
+    select_columns = columns
+    if columns and "remediation_url" in columns and "resource_name" not in columns:
+        select_columns = [*columns, "resource_name"]
+    
+    snapshot = None
+    if FINDINGS_SNAPSHOT_ENABLED:
+        # Resolve filters and the keyset page through the in-memory indexes
+        snapshot = await run_io(findings_store.get)
+        findings, after_id = snapshot.page(filters, decode_cursor(cursor) if cursor else None, limit)
+        next_cursor = encode_cursor(after_id) if after_id else None
+    else:
+        # Get one page of findings from Supabase, filtered server-side
+        findings, next_cursor = await run_io(
+            fetch_findings_page, supabase, select_columns, filters, cursor, limit
+        )
+    
+    # Process findings with HuggingFace model if available
+    classifier, _ = get_models()
+    if classifier and findings and columns is None:
+        await run_inference(enrich_findings, findings, classifier)
+    
+    # Add remediation URLs
+    add_remediation_urls(findings, snapshot)
+    
+    if columns is not None:
+        # Partial rows don't fit the Finding model, so return them as-is
+        findings = [{column: finding.get(column) for column in columns} for finding in findings]
+    return findings, next_cursor
+
+async def stream_findings(columns: Optional[List[str]], filters: Dict[str, Any], cursor: Optional[str]):
+    """Yield findings as NDJSON lines, one Supabase page at a time"""
+    while True:
+        findings, cursor = await load_findings_page(columns, filters, cursor, FINDINGS_STREAM_PAGE_SIZE)
+        for finding in findings:
+            row = finding if columns is not None else jsonable_encoder(Finding(**finding))
+            yield (json.dumps(row, default=str) + "\n").encode("utf-8")
+        if cursor is None:
+            break
+
+def ndjson_response(columns: Optional[List[str]], filters: Dict[str, Any], cursor: Optional[str]):
+    return StreamingResponse(
+        stream_findings(columns, filters, cursor),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"X-Models-Warm": str(models_ready()).lower()},
+    )
+
 @app.get("/findings", response_model=List[Finding])
-async def get_findings():
+async def get_findings(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=FINDINGS_PAGE_SIZE_MAX),
+    cursor: Optional[str] = Depends(findings_cursor),
+    columns: Optional[List[str]] = Depends(findings_columns),
+    filters: Dict[str, Any] = Depends(findings_filters),
+):
+    # Clients that accept NDJSON get the streaming export instead of one array
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return ndjson_response(columns, filters, cursor)
+    
     try:
-        # Get findings from Supabase
-        response = supabase.table("security_findings").select("*").execute()
-        
-        if hasattr(response, "error") and response.error is not None:
-            raise HTTPException(status_code=500, detail=f"Supabase error: {response.error}")
-        
-        findings = response.data
+        findings, next_cursor = await load_findings_page(columns, filters, cursor, limit)
         
-        # Process findings with HuggingFace model if available
-        if classifier and findings:
-            for finding in findings:
-                if "description" in finding:
-                    # Use the model to enrich the finding
-                    try:
-                        result = classifier(finding["description"])
-                        finding["ai_classification"] = result[0] if result else None
-                    except Exception as e:
-                        print(f"Error classifying finding: {e}")
-        
-        # Add remediation URLs
-        for finding in findings:
-            if "resource_name" in finding and finding["resource_name"]:
-                project_id = os.getenv("GOOGLE_PROJECT_ID")
-                resource = finding.get("resource_name", "")
-                
-                # Construct GCP Console URL based on resource type
-                if "compute.googleapis.com" in resource:
-                    finding["remediation_url"] = f"https://console.cloud.google.com/compute/instances?project={project_id}"
-                elif "storage.googleapis.com" in resource:
-                    finding["remediation_url"] = f"https://console.cloud.google.com/storage/browser?project={project_id}"
-                elif "iam" in resource.lower():
-                    finding["remediation_url"] = f"https://console.cloud.google.com/iam-admin/iam?project={project_id}"
-                else:
-                    finding["remediation_url"] = f"https://console.cloud.google.com/security/command-center/findings?project={project_id}"
+        # Until warm-up finishes findings are served without AI enrichment
+        headers = {"X-Models-Warm": str(models_ready()).lower()}
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        if columns is not None:
+            return JSONResponse(content=findings, headers=headers)
         
+        response.headers.update(headers)
         return findings
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/findings/stream")
+async def get_findings_stream(
+    cursor: Optional[str] = Depends(findings_cursor),
+    columns: Optional[List[str]] = Depends(findings_columns),
+    filters: Dict[str, Any] = Depends(findings_filters),
+):
+    return ndjson_response(columns, filters, cursor)
+
+# Columnar scoring arrays, rebuilt when the dataset version or warm-up state changes
+_score_arrays_cache: Dict[str, Any] = {"key": None, "arrays": None}
+
+async def current_score_arrays() -> ScoreArrays:
+    """Fetch, enrich and vectorize every finding for scoring"""
+    key = (await run_io(dataset_version.current), models_ready())
+    if key[0] is not None and _score_arrays_cache["key"] == key:
+        return _score_arrays_cache["arrays"]
+    
+    # Get findings from the shared snapshot or Supabase
+    if FINDINGS_SNAPSHOT_ENABLED:
+        findings, _ = (await run_io(findings_store.get)).page()
+    else:
+        # Paged so the server's max-rows cap can't truncate the scored set
+        findings = await run_io(fetch_all_findings, supabase)
+    
+    # Enhanced AI-powered analysis
+    classifier, severity_model = get_models()
+    if classifier and findings:
+        await run_inference(enrich_findings, findings, classifier, severity_model)
+    
+    # Vectorizing is quick, so it stays off the inference executor and never queues behind the models
+    with stage_timer("scoring"):
+        arrays = await run_io(build_score_arrays, findings)
+    _score_arrays_cache.update(key=key, arrays=arrays)
+    return arrays
+
 @app.get("/compliance-score", response_model=ComplianceScore)
-async def get_compliance_score():
+async def get_compliance_score(response: Response, live: bool = False):
+    response.headers["X-Models-Warm"] = str(models_ready()).lower()
     try:
-        # Get findings from Supabase
-        response = supabase.table("security_findings").select("*").execute()
-        
-        if hasattr(response, "error") and response.error is not None:
-            raise HTTPException(status_code=500, detail=f"Supabase error: {response.error}")
-        
-        findings = response.data
-        
-        # Enhanced AI-powered analysis
-        if classifier and findings:
-            for finding in findings:
-                if "description" in finding:
-                    try:
-                        # Analyze security risk level using AI
-                        classification_result = classifier(finding["description"])
-                        
-                        # Assess severity using sentiment analysis
-                        if severity_model:
-                            severity_result = severity_model(finding["description"])
-                            
-                            # Map sentiment to security severity
-                            sentiment_score = severity_result[0]['score']
-                            if sentiment_score > 0.8:
-                                ai_severity = "CRITICAL"
-                            elif sentiment_score > 0.6:
-                                ai_severity = "HIGH"
-                            elif sentiment_score > 0.4:
-                                ai_severity = "MEDIUM"
-                            else:
-                                ai_severity = "LOW"
-                            
-                            # Update finding with AI assessment
-                            finding["ai_severity"] = ai_severity
-                            finding["ai_confidence"] = sentiment_score
-                        
-                        finding["ai_classification"] = classification_result[0] if classification_result else None
-                    except Exception as e:
-                        print(f"Error in AI analysis: {e}")
+        # Serve the materialized snapshot kept up to date by the sync job
+        if not live:
+            snapshot = await run_io(load_snapshot, supabase)
+            if snapshot is not None:
+                aggregates, last_updated = snapshot
+                overall_score, category_scores = scores_from_aggregates(aggregates)
+                return ComplianceScore(
+                    overall_score=overall_score,
+                    category_scores=category_scores,
+                    last_updated=last_updated or datetime.now().isoformat()
+                )
         
         # Calculate compliance score with AI enhancements
-        total_findings = len(findings)
-        if total_findings == 0:
-            return ComplianceScore(
-                overall_score=100.0,
-                category_scores={
-                    "identity": 100.0,
-                    "network": 100.0,
-                    "compute": 100.0,
-                    "storage": 100.0,
-                    "other": 100.0
-                },
-                last_updated=datetime.now().isoformat()
-            )
-        
-        # Enhanced severity weights with AI input
-        severity_weights = {
-            "CRITICAL": 1.0,
-            "HIGH": 0.7,
-            "MEDIUM": 0.4,
-            "LOW": 0.2
-        }
-        
-        # Initialize category scores
-        categories = {
-            "identity": {"count": 0, "weighted_sum": 0, "ai_weighted_sum": 0},
-            "network": {"count": 0, "weighted_sum": 0, "ai_weighted_sum": 0},
-            "compute": {"count": 0, "weighted_sum": 0, "ai_weighted_sum": 0},
-            "storage": {"count": 0, "weighted_sum": 0, "ai_weighted_sum": 0},
-            "other": {"count": 0, "weighted_sum": 0, "ai_weighted_sum": 0}
-        }
-        
-        # Calculate weighted scores by category with AI enhancement
-        total_weighted = 0
-        total_ai_weighted = 0
-        
-        for finding in findings:
-            severity = finding.get("severity", "MEDIUM").upper()
-            ai_severity = finding.get("ai_severity", severity)
-            category = finding.get("category", "other").lower()
-            ai_confidence = finding.get("ai_confidence", 0.5)
-            
-            # Original weight
-            weight = severity_weights.get(severity, 0.4)
-            
-            # AI-enhanced weight (blend original and AI assessment)
-            ai_weight = severity_weights.get(ai_severity, 0.4)
-            blended_weight = (weight * (1 - ai_confidence)) + (ai_weight * ai_confidence)
-            
-            # Categorize finding
-            if category.startswith("iam") or "permission" in category:
-                cat = "identity"
-            elif "network" in category or "firewall" in category:
-                cat = "network"
-            elif "compute" in category or "instance" in category:
-                cat = "compute"
-            elif "storage" in category or "bucket" in category:
-                cat = "storage"
-            else:
-                cat = "other"
-            
-            categories[cat]["count"] += 1
-            categories[cat]["weighted_sum"] += weight
-            categories[cat]["ai_weighted_sum"] += blended_weight
-            total_weighted += weight
-            total_ai_weighted += blended_weight
-        
-        # Calculate scores using AI-enhanced weights
-        max_possible_score = total_findings
-        overall_score = 100 - (total_ai_weighted / max_possible_score * 100)
-        
-        category_scores = {}
-        for cat, data in categories.items():
-            if data["count"] == 0:
-                category_scores[cat] = 100.0
-            else:
-                # Use AI-enhanced calculation
-                category_score = 100 - (data["ai_weighted_sum"] / data["count"] * 100)
-                category_scores[cat] = round(max(0, min(100, category_score)), 1)
+        arrays = await current_score_arrays()
+        with stage_timer("scoring"):
+            overall_score, category_scores = scores_from_aggregates(aggregate_arrays(arrays))
         
         return ComplianceScore(
-            overall_score=round(max(0, min(100, overall_score)), 1),
+            overall_score=overall_score,
             category_scores=category_scores,
             last_updated=datetime.now().isoformat()
         )
@@ -255,18 +425,85 @@ async def get_compliance_score():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/findings/by-severity")
-async def get_findings_by_severity():
+@app.get("/compliance-score/history", response_model=ScoreHistory)
+async def get_compliance_score_history(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    resolution: Optional[str] = None,
+):
+    # Defaults to the last 30 days at the coarsest resolution that fits the range
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=30)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if resolution is not None and resolution not in HISTORY_RESOLUTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"resolution must be one of: {', '.join(HISTORY_RESOLUTIONS)}"
+        )
+    
+    try:
+        resolution = resolution or pick_resolution(start, end)
+        rows = await run_io(fetch_score_history, supabase, start, end, resolution)
+        return ScoreHistory(
+            resolution=resolution,
+            start=start.isoformat(),
+            end=end.isoformat(),
+            points=[
+                ScoreHistoryPoint(timestamp=row.pop("bucket"), **row)
+                for row in rows
+            ]
+        )
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/compliance-score/simulate", response_model=SimulationResult)
+async def simulate_compliance_score(simulation: SimulationRequest):
     try:
-        # Get findings from Supabase
-        response = supabase.table("security_findings").select("*").execute()
+        arrays = await current_score_arrays()
+        remediated = arrays.mask_for(simulation.remediated_ids)
         
-        if hasattr(response, "error") and response.error is not None:
-            raise HTTPException(status_code=500, detail=f"Supabase error: {response.error}")
+        # Re-score with the chosen findings treated as remediated
+        with stage_timer("scoring"):
+            current_score, current_categories = scores_from_aggregates(aggregate_arrays(arrays))
+            simulated_score, simulated_categories = scores_from_aggregates(aggregate_arrays(arrays, remediated))
         
-        findings = response.data
+        last_updated = datetime.now().isoformat()
+        return SimulationResult(
+            current=ComplianceScore(
+                overall_score=current_score,
+                category_scores=current_categories,
+                last_updated=last_updated
+            ),
+            simulated=ComplianceScore(
+                overall_score=simulated_score,
+                category_scores=simulated_categories,
+                last_updated=last_updated
+            ),
+            remediated_count=int((remediated & arrays.is_open).sum())
+        )
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def count_findings(column: str, include_resolved: bool = False) -> Dict[str, int]:
+    """Count open (or, with include_resolved, all) findings per value from the snapshot indexes or the database"""
+    if FINDINGS_SNAPSHOT_ENABLED:
+        snapshot = await run_io(findings_store.get)
+        return snapshot.count_by(column, {"open_only": not include_resolved})
+    return await run_io(count_findings_by, supabase, column, not include_resolved)
+
+@app.get("/findings/by-severity")
+async def get_findings_by_severity(include_resolved: bool = False):
+    try:
+        # Count findings by severity in the database
+        counts = await count_findings("severity", include_resolved)
         
-        # Count findings by severity
         severity_counts = {
             "CRITICAL": 0,
             "HIGH": 0,
@@ -274,16 +511,44 @@ async def get_findings_by_severity():
             "LOW": 0
         }
         
-        for finding in findings:
-            severity = finding.get("severity", "").upper()
+        for severity, count in counts.items():
+            severity = severity.upper()
             if severity in severity_counts:
-                severity_counts[severity] += 1
+                severity_counts[severity] += count
         
         return severity_counts
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/findings/by-category")
+async def get_findings_by_category(include_resolved: bool = False):
+    try:
+        return await count_findings("category", include_resolved)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/findings/by-status")
+async def get_findings_by_status(include_resolved: bool = False):
+    try:
+        return await count_findings("status", include_resolved)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/findings/by-domain")
+async def get_findings_by_domain(include_resolved: bool = False):
+    try:
+        return await count_findings("domain", include_resolved)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/enrichment/cache")
+async def get_enrichment_cache_stats():
+    cache = await run_io(get_enrichment_cache)
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **(await run_io(cache.stats))}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
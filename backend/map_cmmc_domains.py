@@ -1,32 +1,58 @@
 import os
+import threading
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from supabase.lib.client_options import ClientOptions
-from transformers import pipeline
 import json
-from typing import List, Dict
+from typing import Any, Dict, List, Optional
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from dataset_version import bump_dataset_version
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Supabase client
-supabase_url = os.getenv("VITE_SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_KEY")  # Changed from VITE_SUPABASE_KEY to SUPABASE_KEY
-options = ClientOptions(schema="public")
-supabase: Client = create_client(supabase_url, supabase_key, options=options)
-
 # Initialize HuggingFace
 hf_token = os.getenv("HF_TOKEN")
 
-# Initialize sentence transformer model for embeddings
-try:
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    print("Sentence transformer model loaded successfully")
-except Exception as e:
-    print(f"Error loading sentence transformer model: {e}")
-    model = None
+# Created on first use so the sync can import the classifier without
+# connecting to Supabase or loading the model at import time
+_supabase: Optional[Client] = None
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+_domain_embeddings = None
+
+def get_supabase() -> Client:
+    """Return the Supabase client used by the standalone domain mapping"""
+    global _supabase
+    if _supabase is None:
+        supabase_url = os.getenv("VITE_SUPABASE_URL")
+        supabase_key = os.getenv("SUPABASE_KEY")  # Changed from VITE_SUPABASE_KEY to SUPABASE_KEY
+        options = ClientOptions(schema="public")
+        _supabase = create_client(supabase_url, supabase_key, options=options)
+    return _supabase
+
+def get_embedding_model():
+    """Load the sentence transformer model once, returning None if it can't be loaded"""
+    global _model, _model_loaded, _domain_embeddings
+    with _model_lock:
+        if not _model_loaded:
+            _model_loaded = True
+            try:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer('all-MiniLM-L6-v2')
+                # Domain descriptions never change, so they are encoded once
+                _domain_embeddings = _normalize(
+                    np.asarray(_model.encode(list(CMMC_DOMAIN_DESCRIPTIONS.values())))
+                )
+                print("Sentence transformer model loaded successfully")
+            except Exception as e:
+                print(f"Error loading sentence transformer model: {e}")
+                _model = None
+    return _model
+
+def _normalize(embeddings):
+    return embeddings / np.linalg.norm(embeddings, axis=-1, keepdims=True)
 
 # CMMC Domain mapping based on security finding categories and descriptions
 CMMC_DOMAINS = {
@@ -108,20 +134,16 @@ CMMC_DOMAIN_DESCRIPTIONS = {
     "Situational Awareness (SA)": "Situational awareness policies, procedures, and systems that provide monitoring capabilities, threat intelligence, and analysis to enhance the understanding of the operational environment and potential threats."
 }
 
-def classify_finding_to_cmmc_domain(description: str, category: str) -> str:
-    """
-    Classify a security finding to a CMMC domain based on description and category
-    using both keyword matching and semantic similarity with embeddings
-    """
-    text_to_analyze = f"{category} {description}".lower()
-    
+def _special_case_domain(text_to_analyze: str) -> Optional[str]:
     # Special case handling for leaked credentials
     if "credential" in text_to_analyze and ("leak" in text_to_analyze or "compromise" in text_to_analyze):
         return "Identification and Authentication (IA)"
     
     if "account_has_leaked_credentials" in text_to_analyze or "leaked credentials" in text_to_analyze:
         return "Identification and Authentication (IA)"
-    
+    return None
+
+def _keyword_scores(text_to_analyze: str) -> Dict[str, float]:
     # Score each domain based on keyword matches
     domain_scores = {}
     for domain, keywords in CMMC_DOMAINS.items():
@@ -130,28 +152,9 @@ def classify_finding_to_cmmc_domain(description: str, category: str) -> str:
             if keyword in text_to_analyze:
                 score += 1
         domain_scores[domain] = score
-    
-    # If we have a model for embeddings, use semantic similarity to enhance the scores
-    if model is not None:
-        try:
-            # Get embedding for the finding text
-            finding_embedding = model.encode(text_to_analyze)
-            
-            # Get embeddings for each domain description
-            domain_embeddings = {domain: model.encode(desc) for domain, desc in CMMC_DOMAIN_DESCRIPTIONS.items()}
-            
-            # Calculate cosine similarity between finding and each domain
-            for domain, domain_embedding in domain_embeddings.items():
-                similarity = np.dot(finding_embedding, domain_embedding) / (
-                    np.linalg.norm(finding_embedding) * np.linalg.norm(domain_embedding)
-                )
-                # Scale similarity to be comparable with keyword scores (0-5 range)
-                semantic_score = similarity * 5
-                # Add semantic score to keyword score
-                domain_scores[domain] = domain_scores.get(domain, 0) + semantic_score
-        except Exception as e:
-            print(f"Error calculating semantic similarity: {e}")
-    
+    return domain_scores
+
+def _pick_domain(domain_scores: Dict[str, float], text_to_analyze: str) -> str:
     # Return the domain with the highest score
     if max(domain_scores.values()) > 0:
         return max(domain_scores, key=domain_scores.get)
@@ -168,11 +171,51 @@ def classify_finding_to_cmmc_domain(description: str, category: str) -> str:
         else:
             return "Risk Assessment (RA)"  # Default domain
 
-def update_findings_with_cmmc_domains():
+def classify_findings(findings: List[Dict[str, Any]], use_embeddings: bool = True) -> List[str]:
+    """
+    Classify a batch of security findings to CMMC domains using keyword matching
+    and semantic similarity, encoding every finding in a single model call
+    """
+    texts = [f"{finding.get('category') or ''} {finding.get('description') or ''}".lower() for finding in findings]
+    domains: List[Optional[str]] = [_special_case_domain(text) for text in texts]
+    pending = [index for index, domain in enumerate(domains) if domain is None]
+    if not pending:
+        return domains
+    
+    scores = {index: _keyword_scores(texts[index]) for index in pending}
+    
+    # If we have a model for embeddings, use semantic similarity to enhance the scores
+    model = get_embedding_model() if use_embeddings else None
+    if model is not None:
+        try:
+            finding_embeddings = _normalize(np.asarray(model.encode([texts[index] for index in pending])))
+            # Cosine similarity between every finding and every domain
+            similarities = finding_embeddings @ _domain_embeddings.T
+            for row, index in enumerate(pending):
+                for column, domain in enumerate(CMMC_DOMAIN_DESCRIPTIONS):
+                    # Scale similarity to be comparable with keyword scores (0-5 range)
+                    scores[index][domain] = scores[index].get(domain, 0) + float(similarities[row, column]) * 5
+        except Exception as e:
+            print(f"Error calculating semantic similarity: {e}")
+    
+    for index in pending:
+        domains[index] = _pick_domain(scores[index], texts[index])
+    return domains
+
+def classify_finding_to_cmmc_domain(description: str, category: str) -> str:
+    """
+    Classify a security finding to a CMMC domain based on description and category
+    using both keyword matching and semantic similarity with embeddings
+    """
+    return classify_findings([{"description": description, "category": category}])[0]
+
+def update_findings_with_cmmc_domains(supabase: Optional[Client] = None):
     """
     Fetch all findings and update them with CMMC domain mappings
     """
     try:
+        supabase = supabase or get_supabase()
+        
         # Fetch all findings that don't have a domain assigned
         response = supabase.table("security_findings").select("*").is_("domain", "null").execute()
         
@@ -226,6 +269,8 @@ def update_findings_with_cmmc_domains():
                 print(f"Problematic finding: {finding}")
         
         print(f"Successfully updated {updated_count} findings with CMMC domains")
+        if updated_count:
+            bump_dataset_version(supabase)
         
     except Exception as e:
         print(f"Error in update_findings_with_cmmc_domains: {e}")
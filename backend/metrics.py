@@ -0,0 +1,73 @@
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Shared by the FastAPI backend and the Flask chatbot; each process exposes its own /metrics
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["app", "method", "route", "status"],
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["app"],
+)
+
+STAGE_LATENCY = Histogram(
+    "stage_duration_seconds",
+    "Time spent in each processing stage",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+STAGES_IN_FLIGHT = Gauge(
+    "stages_in_flight",
+    "Processing stages currently running",
+    ["stage"],
+)
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Cache lookups by cache and result (hit or miss)",
+    ["cache", "result"],
+)
+
+MODEL_LOAD_SECONDS = Gauge(
+    "model_load_seconds",
+    "Time taken to load each model",
+    ["model"],
+)
+
+MODELS_WARM = Gauge(
+    "models_warm",
+    "Whether the enrichment models have finished loading",
+)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time a block of work as one processing stage"""
+    STAGES_IN_FLIGHT.labels(stage).inc()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(stage).observe(time.perf_counter() - started)
+        STAGES_IN_FLIGHT.labels(stage).dec()
+
+
+def record_cache_lookups(cache: str, hits: int, misses: int) -> None:
+    """Count hits and misses for a cache"""
+    if hits:
+        CACHE_LOOKUPS.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache, "miss").inc(misses)
+
+
+def render_metrics():
+    """Return the Prometheus text exposition body and its content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
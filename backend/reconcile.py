@@ -0,0 +1,110 @@
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+from findings_query import FINDINGS_TABLE, fetch_all_findings, fetch_findings_by_id
+from scoring import RESOLVED_STATUSES, SCORING_COLUMNS, apply_delta, counts_toward_score
+from sync_state import parse_timestamp
+
+ARCHIVE_TABLE = "security_findings_archive"
+
+# "resolve" marks findings that left SCC as RESOLVED in place; "archive" moves
+# them, and any other resolved findings, out of the hot table
+RECONCILE_MODES = ("resolve", "archive", "off")
+RECONCILE_MODE = os.getenv("RECONCILE_MODE", "resolve").lower()
+
+RESOLVED_STATUS = "RESOLVED"
+
+# Ids per PostgREST request, keeping in.(...) filters well under URL limits
+RECONCILE_CHUNK_SIZE = 200
+
+
+def find_missing_findings(supabase, fetched_ids: Set[str], window_start: datetime) -> List[str]:
+    """
+    Ids of stored open findings that a full reconciliation did not return.
+
+    Only findings first observed inside the reconciliation window are
+    considered; older ones were never listed, so their absence means nothing.
+    """
+    missing = []
+    for row in fetch_all_findings(supabase, ["id", "status", "first_observed"]):
+        if row["id"] in fetched_ids or not counts_toward_score(row):
+            continue
+        first_observed = parse_timestamp(row.get("first_observed"))
+        if first_observed is not None and first_observed >= window_start:
+            missing.append(row["id"])
+    return missing
+
+
+def _chunks(values: List[str]):
+    for start in range(0, len(values), RECONCILE_CHUNK_SIZE):
+        yield values[start:start + RECONCILE_CHUNK_SIZE]
+
+
+def resolve_findings(
+    supabase,
+    finding_ids: List[str],
+    aggregates: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> int:
+    """Bulk-mark findings as resolved, applying the change to the score aggregates"""
+    if not finding_ids:
+        return 0
+    previous = fetch_findings_by_id(supabase, SCORING_COLUMNS, finding_ids)
+    for chunk in _chunks(finding_ids):
+        # Clearing the hash makes the sync rewrite the row if the finding reappears
+        supabase.table(FINDINGS_TABLE).update(
+            {"status": RESOLVED_STATUS, "content_hash": None}
+        ).in_("id", chunk).execute()
+
+    for old in previous.values():
+        if aggregates is not None:
+            apply_delta(aggregates, old, {**old, "status": RESOLVED_STATUS})
+    return len(previous)
+
+
+def archive_findings(
+    supabase,
+    finding_ids: List[str],
+    aggregates: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> int:
+    """
+    Move findings that left SCC, and every already-resolved finding, to the
+    archive table so the hot table only holds live findings.
+    """
+    rows = list(fetch_findings_by_id(supabase, ["*"], finding_ids).values()) if finding_ids else []
+    for row in rows:
+        if aggregates is not None:
+            apply_delta(aggregates, row, None)
+        row["status"] = RESOLVED_STATUS
+
+    # Findings SCC itself reported as inactive were already updated by the sync
+    rows.extend(fetch_all_findings(supabase, None, {"status": ",".join(sorted(RESOLVED_STATUSES))}))
+    if not rows:
+        return 0
+
+    # Copy before deleting so an interrupted run leaves duplicates, never gaps
+    for start in range(0, len(rows), RECONCILE_CHUNK_SIZE):
+        supabase.table(ARCHIVE_TABLE).upsert(rows[start:start + RECONCILE_CHUNK_SIZE], on_conflict="id").execute()
+    for chunk in _chunks([row["id"] for row in rows]):
+        supabase.table(FINDINGS_TABLE).delete().in_("id", chunk).execute()
+    return len(rows)
+
+
+def reconcile_findings(
+    supabase,
+    fetched_ids: Set[str],
+    window_start: datetime,
+    aggregates: Optional[Dict[str, Dict[str, Any]]] = None,
+    mode: str = RECONCILE_MODE,
+) -> Dict[str, Any]:
+    """Resolve or archive stored findings that a full reconciliation no longer returned"""
+    if mode not in RECONCILE_MODES:
+        raise ValueError(f"RECONCILE_MODE must be one of: {', '.join(RECONCILE_MODES)}")
+    if mode == "off":
+        return {"missing": 0, "resolved": 0, "archived": 0}
+
+    missing = find_missing_findings(supabase, fetched_ids, window_start)
+    if mode == "archive":
+        archived = archive_findings(supabase, missing, aggregates)
+        return {"missing": len(missing), "resolved": 0, "archived": archived}
+    resolved = resolve_findings(supabase, missing, aggregates)
+    return {"missing": len(missing), "resolved": resolved, "archived": 0}
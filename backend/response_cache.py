@@ -0,0 +1,75 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from metrics import record_cache_lookups
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+
+
+class CachedResponse:
+    """A rendered response body stored against the dataset version it was built from"""
+
+    def __init__(self, version: str, body: bytes, status_code: int, headers: Dict[str, str]):
+        self.version = version
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+class ResponseCache:
+    """LRU cache of API responses keyed by endpoint and query parameters"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple, version: str) -> Optional[CachedResponse]:
+        """Return the cached response if it was built from this dataset version"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                if entry is not None:
+                    # Built from an older dataset version
+                    del self._entries[key]
+                self.misses += 1
+                record_cache_lookups("response", 0, 1)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            record_cache_lookups("response", 1, 0)
+            return entry
+
+    def put(self, key: Tuple, entry: CachedResponse) -> None:
+        """Store a response, evicting the least recently used entries"""
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
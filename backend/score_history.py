@@ -0,0 +1,136 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from metrics import stage_timer
+from scoring import SCORE_CATEGORIES, scores_from_aggregates, total_severity_counts
+
+HISTORY_TABLE = "compliance_score_history"
+
+# Every sync writes a raw point, which is also folded into its hour and day buckets
+HISTORY_RESOLUTIONS = ("raw", "hour", "day")
+
+# How long each resolution is kept; daily points are kept forever
+HISTORY_RAW_RETENTION_DAYS = int(os.getenv("HISTORY_RAW_RETENTION_DAYS", "7"))
+HISTORY_HOURLY_RETENTION_DAYS = int(os.getenv("HISTORY_HOURLY_RETENTION_DAYS", "90"))
+
+SEVERITY_LEVELS = ("CRITICAL", "HIGH", "MEDIUM", "LOW")
+
+
+def bucket_start(recorded_at: datetime, resolution: str) -> datetime:
+    """Truncate a timestamp to the start of its bucket"""
+    if resolution == "hour":
+        return recorded_at.replace(minute=0, second=0, microsecond=0)
+    if resolution == "day":
+        return recorded_at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return recorded_at
+
+
+def pick_resolution(start: datetime, end: datetime) -> str:
+    """Choose the coarsest resolution that still gives a useful number of points"""
+    span = end - start
+    if span <= timedelta(days=2) and start >= datetime.now(timezone.utc) - timedelta(days=HISTORY_RAW_RETENTION_DAYS):
+        return "raw"
+    if span <= timedelta(days=60) and start >= datetime.now(timezone.utc) - timedelta(days=HISTORY_HOURLY_RETENTION_DAYS):
+        return "hour"
+    return "day"
+
+
+def history_point(aggregates: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Build a single-sample history point from the current aggregates"""
+    overall_score, category_scores = scores_from_aggregates(aggregates)
+    severity_counts = total_severity_counts(aggregates)
+    return {
+        "overall_score": overall_score,
+        "overall_min": overall_score,
+        "overall_max": overall_score,
+        "category_scores": category_scores,
+        "severity_counts": {level: int(severity_counts.get(level, 0)) for level in SEVERITY_LEVELS},
+        "samples": 1,
+    }
+
+
+def merge_point(existing: Optional[Dict[str, Any]], point: Dict[str, Any]) -> Dict[str, Any]:
+    """Fold a new sample into a rolled-up bucket (scores averaged, counts take the latest)"""
+    if not existing:
+        return dict(point)
+
+    samples = int(existing.get("samples") or 1)
+    total = samples + point["samples"]
+
+    def average(old: float, new: float) -> float:
+        return round((old * samples + new * point["samples"]) / total, 2)
+
+    old_categories = existing.get("category_scores") or {}
+    return {
+        "overall_score": average(float(existing["overall_score"]), point["overall_score"]),
+        "overall_min": min(float(existing.get("overall_min", existing["overall_score"])), point["overall_min"]),
+        "overall_max": max(float(existing.get("overall_max", existing["overall_score"])), point["overall_max"]),
+        "category_scores": {
+            cat: average(float(old_categories.get(cat, point["category_scores"][cat])), point["category_scores"][cat])
+            for cat in SCORE_CATEGORIES
+        },
+        "severity_counts": point["severity_counts"],
+        "samples": total,
+    }
+
+
+def record_score_history(
+    supabase,
+    aggregates: Dict[str, Dict[str, Any]],
+    recorded_at: Optional[datetime] = None,
+) -> None:
+    """Record the current score as a raw point and roll it into its hour and day buckets"""
+    recorded_at = recorded_at or datetime.now(timezone.utc)
+    point = history_point(aggregates)
+
+    buckets = {resolution: bucket_start(recorded_at, resolution).isoformat() for resolution in ("hour", "day")}
+    response = (
+        supabase.table(HISTORY_TABLE)
+        .select("*")
+        .in_("resolution", list(buckets))
+        .in_("bucket", list(buckets.values()))
+        .execute()
+    )
+    existing = {
+        row["resolution"]: row for row in response.data
+        if buckets.get(row["resolution"]) is not None
+        and datetime.fromisoformat(row["bucket"]) == datetime.fromisoformat(buckets[row["resolution"]])
+    }
+
+    rows = [{"resolution": "raw", "bucket": recorded_at.isoformat(), **point}]
+    for resolution, bucket in buckets.items():
+        rows.append({"resolution": resolution, "bucket": bucket, **merge_point(existing.get(resolution), point)})
+    supabase.table(HISTORY_TABLE).upsert(rows, on_conflict="resolution,bucket").execute()
+
+    prune_score_history(supabase, recorded_at)
+
+
+def prune_score_history(supabase, now: Optional[datetime] = None) -> None:
+    """Drop raw and hourly points that are older than their retention"""
+    now = now or datetime.now(timezone.utc)
+    for resolution, days in (("raw", HISTORY_RAW_RETENTION_DAYS), ("hour", HISTORY_HOURLY_RETENTION_DAYS)):
+        cutoff = (now - timedelta(days=days)).isoformat()
+        supabase.table(HISTORY_TABLE).delete().eq("resolution", resolution).lt("bucket", cutoff).execute()
+
+
+def fetch_score_history(
+    supabase,
+    start: datetime,
+    end: datetime,
+    resolution: str,
+) -> List[Dict[str, Any]]:
+    """Fetch the history points of one resolution within a time range"""
+    with stage_timer("score_history_fetch"):
+        response = (
+            supabase.table(HISTORY_TABLE)
+            .select("bucket, overall_score, overall_min, overall_max, category_scores, severity_counts, samples")
+            .eq("resolution", resolution)
+            .gte("bucket", start.isoformat())
+            .lte("bucket", end.isoformat())
+            .order("bucket")
+            .execute()
+        )
+
+    if hasattr(response, "error") and response.error is not None:
+        raise RuntimeError(f"Supabase error: {response.error}")
+    return response.data
@@ -0,0 +1,224 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+# Enhanced severity weights with AI input
+SEVERITY_WEIGHTS = {
+    "CRITICAL": 1.0,
+    "HIGH": 0.7,
+    "MEDIUM": 0.4,
+    "LOW": 0.2
+}
+
+SCORE_CATEGORIES = ("identity", "network", "compute", "storage", "other")
+
+# Findings in these states no longer count against the compliance score
+RESOLVED_STATUSES = {"RESOLVED", "INACTIVE", "CLOSED"}
+
+# Columns the score is computed from; the AI ones are filled in by the sync
+SCORING_COLUMNS = ["id", "severity", "category", "status", "ai_severity", "ai_confidence"]
+
+
+def categorize(category: str) -> str:
+    """Map a finding category to one of the compliance score categories"""
+    category = (category or "other").lower()
+    if category.startswith("iam") or "permission" in category:
+        return "identity"
+    elif "network" in category or "firewall" in category:
+        return "network"
+    elif "compute" in category or "instance" in category:
+        return "compute"
+    elif "storage" in category or "bucket" in category:
+        return "storage"
+    else:
+        return "other"
+
+
+def counts_toward_score(finding: Dict[str, Any]) -> bool:
+    """Whether a finding is still open and should affect the score"""
+    return (finding.get("status") or "ACTIVE").upper() not in RESOLVED_STATUSES
+
+
+def finding_weights(finding: Dict[str, Any]) -> Tuple[str, float, float]:
+    """Return the score category, severity weight and AI-blended weight of a finding"""
+    severity = (finding.get("severity") or "MEDIUM").upper()
+    # Rows the severity model hasn't seen yet store NULLs
+    ai_severity = finding.get("ai_severity") or severity
+    ai_confidence = _confidence(finding)
+
+    # Original weight
+    weight = SEVERITY_WEIGHTS.get(severity, 0.4)
+
+    # AI-enhanced weight (blend original and AI assessment)
+    ai_weight = SEVERITY_WEIGHTS.get(ai_severity, 0.4)
+    blended_weight = (weight * (1 - ai_confidence)) + (ai_weight * ai_confidence)
+
+    return categorize(finding.get("category")), weight, blended_weight
+
+
+def _confidence(finding: Dict[str, Any]) -> float:
+    """AI confidence of a finding, 0.5 when it has not been enriched"""
+    confidence = finding.get("ai_confidence")
+    return 0.5 if confidence is None else float(confidence)
+
+
+def empty_aggregates() -> Dict[str, Dict[str, Any]]:
+    """Return zeroed per-category aggregates"""
+    return {
+        cat: {"count": 0, "weighted_sum": 0.0, "ai_weighted_sum": 0.0, "severity_counts": {}}
+        for cat in SCORE_CATEGORIES
+    }
+
+
+def total_severity_counts(aggregates: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+    """Sum the per-category open-finding counts by severity"""
+    totals: Dict[str, int] = {}
+    for data in aggregates.values():
+        for severity, count in (data.get("severity_counts") or {}).items():
+            if count:
+                totals[severity] = totals.get(severity, 0) + int(count)
+    return totals
+
+
+def add_finding(aggregates: Dict[str, Dict[str, float]], finding: Dict[str, Any], sign: int = 1) -> None:
+    """Add (or with sign=-1, remove) a finding's contribution to the aggregates"""
+    if not counts_toward_score(finding):
+        return
+    cat, weight, blended_weight = finding_weights(finding)
+    severity = (finding.get("severity") or "MEDIUM").upper()
+    data = aggregates[cat]
+    data["count"] = max(0, data["count"] + sign)
+    data["weighted_sum"] += sign * weight
+    data["ai_weighted_sum"] += sign * blended_weight
+    severities = data.setdefault("severity_counts", {})
+    severities[severity] = max(0, severities.get(severity, 0) + sign)
+    if data["count"] == 0:
+        # Clear accumulated floating point drift once a category empties
+        data["weighted_sum"] = 0.0
+        data["ai_weighted_sum"] = 0.0
+        data["severity_counts"] = {}
+
+
+def apply_delta(
+    aggregates: Dict[str, Dict[str, float]],
+    old: Optional[Dict[str, Any]],
+    new: Optional[Dict[str, Any]],
+) -> None:
+    """Apply an insert (old=None), update, or removal (new=None) to the aggregates"""
+    if old is not None:
+        add_finding(aggregates, old, sign=-1)
+    if new is not None:
+        add_finding(aggregates, new)
+
+
+def scores_from_aggregates(aggregates: Dict[str, Dict[str, float]]) -> Tuple[float, Dict[str, float]]:
+    """Turn per-category aggregates into the overall and per-category scores"""
+    total_findings = sum(data["count"] for data in aggregates.values())
+    if total_findings == 0:
+        return 100.0, {cat: 100.0 for cat in SCORE_CATEGORIES}
+
+    # Calculate scores using AI-enhanced weights
+    total_ai_weighted = sum(data["ai_weighted_sum"] for data in aggregates.values())
+    overall_score = 100 - (total_ai_weighted / total_findings * 100)
+
+    category_scores = {}
+    for cat, data in aggregates.items():
+        if data["count"] == 0:
+            category_scores[cat] = 100.0
+        else:
+            # Use AI-enhanced calculation
+            category_score = 100 - (data["ai_weighted_sum"] / data["count"] * 100)
+            category_scores[cat] = round(max(0, min(100, category_score)), 1)
+
+    return round(max(0, min(100, overall_score)), 1), category_scores
+
+
+class ScoreArrays:
+    """Columnar view of findings used by the vectorized scoring engine"""
+
+    def __init__(self, ids, weight, ai_weight, confidence, category_code, is_open, severity_names, severity_code):
+        self.ids = ids
+        self.weight = weight
+        self.ai_weight = ai_weight
+        self.confidence = confidence
+        self.category_code = category_code
+        self.is_open = is_open
+        self.severity_names = severity_names
+        self.severity_code = severity_code
+        self._positions = {finding_id: i for i, finding_id in enumerate(ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def mask_for(self, finding_ids: Iterable[str]) -> np.ndarray:
+        """Boolean mask selecting the given finding ids"""
+        mask = np.zeros(len(self.ids), dtype=bool)
+        positions = [self._positions[i] for i in finding_ids if i in self._positions]
+        mask[positions] = True
+        return mask
+
+
+def _lookup(values: List[str], mapping) -> np.ndarray:
+    """Map each string through mapping, evaluating it once per distinct value"""
+    if not values:
+        return np.zeros(0)
+    uniques, inverse = np.unique(np.array(values, dtype=object), return_inverse=True)
+    return np.array([mapping(value) for value in uniques])[inverse]
+
+
+def build_score_arrays(findings: List[Dict[str, Any]]) -> ScoreArrays:
+    """Build the columnar arrays (weights, confidence, category code) for a set of findings"""
+    severities = [(finding.get("severity") or "MEDIUM").upper() for finding in findings]
+    ai_severities = [finding.get("ai_severity") or severity for finding, severity in zip(findings, severities)]
+    categories = [(finding.get("category") or "other").lower() for finding in findings]
+    category_codes = {cat: code for code, cat in enumerate(SCORE_CATEGORIES)}
+    severity_names, severity_code = (
+        np.unique(np.array(severities, dtype=object), return_inverse=True) if severities else ([], np.zeros(0))
+    )
+
+    return ScoreArrays(
+        ids=[finding.get("id") for finding in findings],
+        weight=_lookup(severities, lambda sev: SEVERITY_WEIGHTS.get(sev, 0.4)).astype(np.float64),
+        ai_weight=_lookup(ai_severities, lambda sev: SEVERITY_WEIGHTS.get(sev, 0.4)).astype(np.float64),
+        confidence=np.array([_confidence(finding) for finding in findings], dtype=np.float64),
+        category_code=_lookup(categories, lambda cat: category_codes[categorize(cat)]).astype(np.int64),
+        is_open=np.array([counts_toward_score(finding) for finding in findings], dtype=bool),
+        severity_names=list(severity_names),
+        severity_code=np.asarray(severity_code).astype(np.int64),
+    )
+
+
+def aggregate_arrays(arrays: ScoreArrays, remediated: Optional[np.ndarray] = None) -> Dict[str, Dict[str, float]]:
+    """Compute per-category aggregates in one vectorized pass, excluding remediated findings"""
+    if len(arrays) == 0:
+        return empty_aggregates()
+
+    included = arrays.is_open if remediated is None else arrays.is_open & ~remediated
+    blended = arrays.weight * (1 - arrays.confidence) + arrays.ai_weight * arrays.confidence
+    size = len(SCORE_CATEGORIES)
+
+    counts = np.bincount(arrays.category_code[included], minlength=size)
+    weighted_sums = np.bincount(arrays.category_code[included], weights=arrays.weight[included], minlength=size)
+    ai_weighted_sums = np.bincount(arrays.category_code[included], weights=blended[included], minlength=size)
+
+    # Open findings per (category, severity) pair in one more bincount
+    levels = len(arrays.severity_names)
+    pairs = np.bincount(
+        arrays.category_code[included] * levels + arrays.severity_code[included], minlength=size * levels
+    ).reshape(size, levels)
+
+    return {
+        cat: {
+            "count": int(counts[code]),
+            "weighted_sum": float(weighted_sums[code]),
+            "ai_weighted_sum": float(ai_weighted_sums[code]),
+            "severity_counts": {
+                name: int(count) for name, count in zip(arrays.severity_names, pairs[code]) if count
+            },
+        }
+        for code, cat in enumerate(SCORE_CATEGORIES)
+    }
+
+
+def score_findings(findings: List[Dict[str, Any]]) -> Tuple[float, Dict[str, float]]:
+    """Score a list of findings with the vectorized engine"""
+    return scores_from_aggregates(aggregate_arrays(build_score_arrays(findings)))
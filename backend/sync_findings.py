@@ -1,37 +1,191 @@
+import hashlib
+import json
 import os
 import time
+from datetime import datetime, timedelta, timezone
 from supabase import create_client
-from google_cloud import fetch_security_findings
+from batch_writer import BatchUpserter
+from google_cloud import SccSession, full_sync_window_start, iter_security_findings
+from enrichment import enrich_findings, get_models, load_models, model_status
+from compliance_snapshot import load_snapshot, rebuild_snapshot, save_snapshot, snapshot_complete
+from findings_query import fetch_all_findings, fetch_findings_by_id
+from map_cmmc_domains import classify_findings
+from reconcile import reconcile_findings
+from score_history import record_score_history
+from scoring import SCORING_COLUMNS, apply_delta, counts_toward_score
+from dataset_version import bump_dataset_version
+from sync_pipeline import PipelineError, run_pipeline
+from sync_scheduler import AdaptiveSchedule, SyncTrigger, start_trigger_server
+from sync_state import (
+    SCC_LAST_FULL_SYNC_KEY,
+    SCC_WATERMARK_KEY,
+    load_sync_state,
+    parse_timestamp,
+    save_sync_state,
+)
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-def sync_findings_to_supabase():
-    """Fetch findings from Google Cloud and store them in Supabase"""
+# Incremental syncs fetch only findings changed since the watermark; a full
+# reconciliation re-lists every active finding on this longer schedule
+FULL_SYNC_INTERVAL_SECONDS = int(os.getenv("FULL_SYNC_INTERVAL_SECONDS", "86400"))
+# Re-read this much before the watermark to catch late-arriving events
+WATERMARK_OVERLAP_SECONDS = int(os.getenv("WATERMARK_OVERLAP_SECONDS", "300"))
+
+# Set each changed finding's CMMC domain before it is written; without the
+# embedding model the keyword classifier is used
+SYNC_CLASSIFY_DOMAINS = os.getenv("SYNC_CLASSIFY_DOMAINS", "true").lower() == "true"
+SYNC_DOMAIN_EMBEDDINGS = os.getenv("SYNC_DOMAIN_EMBEDDINGS", "true").lower() == "true"
+
+# Store the severity model's AI severity and confidence on each changed
+# finding, so the compliance snapshot carries the AI-blended score
+SYNC_ENRICH_SEVERITY = os.getenv("SYNC_ENRICH_SEVERITY", "true").lower() == "true"
+
+# Initial delay between daemon sync cycles; it then adapts to the change rate
+SYNC_INTERVAL_SECONDS = int(os.getenv("SYNC_INTERVAL_SECONDS", "3600"))
+
+# Fields written by the sync; content_hash covers exactly these
+SYNCED_FIELDS = (
+    "id",
+    "category",
+    "severity",
+    "description",
+    "resource_name",
+    "first_observed",
+    "last_observed",
+    "status",
+)
+
+# Inserted/updated/unchanged counts and per-stage throughput of the most recent run
+last_sync_stats = {}
+
+def finding_hash(finding) -> str:
+    """Hash the synced fields of a finding so unchanged rows can be skipped"""
+    content = json.dumps({field: finding.get(field) for field in SYNCED_FIELDS}, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def sync_severity_model():
+    """Load the severity pipeline once per process; None when disabled or it failed to load"""
+    if not SYNC_ENRICH_SEVERITY:
+        return None
+    if model_status()["state"] == "pending":
+        load_models(os.getenv("HF_TOKEN"))
+    return get_models()[1]
+
+def plan_fetch(supabase, watermark, force_full: bool = False, incremental_only: bool = False):
+    """
+    Decide between a full and an incremental fetch, returning the since time (None for full).
+    incremental_only defers a due full reconciliation to the next scheduled run.
+    """
+    if force_full or watermark is None or os.getenv("SYNC_MODE", "incremental").lower() == "full":
+        return None
+    if incremental_only:
+        return watermark - timedelta(seconds=WATERMARK_OVERLAP_SECONDS)
+    
+    last_full_sync = parse_timestamp(load_sync_state(supabase, SCC_LAST_FULL_SYNC_KEY))
+    if last_full_sync is None:
+        return None
+    if datetime.now(timezone.utc) - last_full_sync >= timedelta(seconds=FULL_SYNC_INTERVAL_SECONDS):
+        return None
+    return watermark - timedelta(seconds=WATERMARK_OVERLAP_SECONDS)
+
+def latest_observed(findings, latest=None):
+    """Return the highest last_observed time among findings and a running maximum"""
+    for finding in findings:
+        observed = parse_timestamp(finding.get("last_observed"))
+        if observed is not None and (latest is None or observed > latest):
+            latest = observed
+    return latest
+
+def publish_sync(supabase, aggregates, changed: bool = True, record_history: bool = True) -> None:
+    """
+    Save the compliance snapshot and history, then bump the dataset version.
+    Missing aggregates are rebuilt from the findings table.
+    """
+    # Keep the compliance score snapshot, severity counts included, in step with the findings table
+    if changed or aggregates is None:
+        try:
+            if aggregates is None:
+                aggregates = rebuild_snapshot(supabase, fetch_all_findings(supabase, SCORING_COLUMNS))
+            else:
+                save_snapshot(supabase, aggregates)
+        except Exception as snapshot_error:
+            print(f"Error updating compliance snapshot: {snapshot_error}")
+            aggregates = None
+    
+    # Record this run in the compliance score time series
+    if record_history and aggregates is not None:
+        try:
+            record_score_history(supabase, aggregates)
+        except Exception as history_error:
+            print(f"Error recording compliance score history: {history_error}")
+    
+    # Bumped last so cached responses are rebuilt from the new snapshot; an
+    # unchanged table keeps every downstream cache valid
+    if changed:
+        bump_dataset_version(supabase)
+
+def create_supabase_client():
+    """Create the Supabase client used by the sync, or None without credentials"""
+    supabase_url = os.getenv("VITE_SUPABASE_URL")
+    supabase_key = os.getenv("VITE_SUPABASE_KEY")
+    
+    if not supabase_url or not supabase_key:
+        print("Supabase credentials not found")
+        return None
+    
+    return create_client(supabase_url, supabase_key)
+
+def sync_findings_to_supabase(
+    force_full: bool = False,
+    supabase=None,
+    scc_client=None,
+    incremental_only: bool = False,
+    finding_names=None,
+):
+    """
+    Fetch findings from Google Cloud and store them in Supabase.
+
+    The daemon passes in long-lived Supabase and SCC clients; standalone runs
+    create their own. Triggered runs pass incremental_only so they stay cheap,
+    or the full names of the notified findings to fetch just those. A targeted
+    run leaves the watermark alone, so the next scheduled sync still lists
+    everything else that changed.
+    """
     try:
         # Initialize Supabase client
-        supabase_url = os.getenv("VITE_SUPABASE_URL")
-        supabase_key = os.getenv("VITE_SUPABASE_KEY")
-        
-        if not supabase_url or not supabase_key:
-            print("Supabase credentials not found")
+        supabase = supabase or create_supabase_client()
+        if supabase is None:
             return False
         
-        supabase = create_client(supabase_url, supabase_key)
-        
-        # Fetch findings from Google Cloud
-        findings = fetch_security_findings()
+        # Decide between an incremental fetch and a full reconciliation
+        sync_started = datetime.now(timezone.utc)
+        watermark = parse_timestamp(load_sync_state(supabase, SCC_WATERMARK_KEY))
+        # Until a first sync has set the watermark there is nothing to target
+        targeted = finding_names is not None and watermark is not None and not force_full
+        since = watermark if targeted else plan_fetch(supabase, watermark, force_full, incremental_only)
         
-        if not findings:
-            print("No findings fetched from Google Cloud")
-            return False
+        severity_model = sync_severity_model()
         
-        # Get existing findings from Supabase
-        response = supabase.table("security_findings").select("id").execute()
-        
-        if hasattr(response, "error") and response.error is not None:
-            print(f"Error fetching existing findings: {response.error}")
+        # Only id and content hash pairs are read to decide what to write, plus
+        # which rows still lack an AI severity or a CMMC domain
+        try:
+            stored_hashes = {}
+            unenriched = set()
+            # AI values of rows without a domain, kept if they're rewritten without the severity model
+            unclassified = {}
+            for row in fetch_all_findings(
+                supabase, ["id", "content_hash", "ai_severity", "ai_confidence", "domain"]
+            ):
+                stored_hashes[row["id"]] = row.get("content_hash")
+                if row.get("ai_severity") is None:
+                    unenriched.add(row["id"])
+                if row.get("domain") is None:
+                    unclassified[row["id"]] = (row.get("ai_severity"), row.get("ai_confidence"))
+        except Exception as fetch_error:
+            print(f"Error fetching existing findings: {fetch_error}")
             
             # Try to create the table if it doesn't exist
             try:
@@ -42,36 +196,277 @@ def sync_findings_to_supabase():
                 supabase.table("security_findings").delete().eq("id", "dummy").execute()
             except Exception as table_error:
                 print(f"Failed to create table: {table_error}")
-                return False
+            return False
+        
+        # Load the materialized compliance score and severity counts so this run can apply deltas
+        snapshot = load_snapshot(supabase)
+        aggregates = snapshot[0] if snapshot else None
+        if aggregates is not None and not snapshot_complete(aggregates):
+            # Severity counts that don't add up (e.g. saved before they were stored) are rebuilt at the end
+            aggregates = None
+        
+        if targeted:
+            print(f"Fetching {len(finding_names)} notified findings")
+        elif since is None:
+            print("Running full reconciliation")
         else:
-            existing_findings = {item["id"] for item in response.data}
-            
-            # Process findings
-            for finding in findings:
-                finding_id = finding["id"]
-                
-                if finding_id in existing_findings:
-                    # Update existing finding
-                    supabase.table("security_findings").update(finding).eq("id", finding_id).execute()
+            print(f"Fetching findings changed since {since.isoformat()}")
+        
+        # Pages flow through normalize, enrich, score, classify and upsert stages, each on its
+        # own thread behind a bounded queue, while later pages are still listed
+        writer = BatchUpserter(supabase, "security_findings")
+        stats = {"fetched": 0, "inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0, "resolved": 0, "archived": 0}
+        fetched_ids = set()
+        # Ids already in the table before this run, whose old values are subtracted from the score
+        previous_ids = set(stored_hashes)
+        latest = None
+        
+        def normalize(page):
+            """Hash each finding and drop unchanged ones"""
+            nonlocal latest
+            changed = []
+            for finding in page:
+                if finding["id"] not in stored_hashes and not counts_toward_score(finding):
+                    # Already resolved and archived, or never stored while open
+                    stats["skipped"] += 1
+                    continue
+                finding["content_hash"] = finding_hash(finding)
+                content_changed = stored_hashes.get(finding["id"], "") != finding["content_hash"]
+                # Rows stored before the severity model or domain classifier ran
+                # are completed once that stage is available, even if unchanged
+                needs_enrichment = bool(severity_model) and finding["id"] in unenriched
+                needs_domain = SYNC_CLASSIFY_DOMAINS and finding["id"] in unclassified
+                if not (content_changed or needs_enrichment or needs_domain):
+                    stats["unchanged"] += 1
+                    continue
+                if finding["id"] in stored_hashes:
+                    stats["updated"] += 1
                 else:
-                    # Insert new finding
-                    supabase.table("security_findings").insert(finding).execute()
+                    stats["inserted"] += 1
+                stored_hashes[finding["id"]] = finding["content_hash"]
+                unenriched.discard(finding["id"])
+                stored_ai = unclassified.pop(finding["id"], (None, None))
+                if content_changed or severity_model:
+                    # Cleared unless re-assessed, so a stale AI severity never outlives its description
+                    stored_ai = (None, None)
+                finding["ai_severity"], finding["ai_confidence"] = stored_ai
+                changed.append(finding)
             
-            print(f"Synced {len(findings)} findings to Supabase")
+            stats["fetched"] += len(page)
+            fetched_ids.update(finding["id"] for finding in page)
+            latest = latest_observed(page, latest)
+            return changed
+        
+        def enrich(findings):
+            """Set the AI severity and confidence, served from the enrichment cache where possible"""
+            enrich_findings(findings, None, severity_model)
+            return findings
+        
+        def score(findings):
+            """Apply scoring deltas once the AI severity is known"""
+            if aggregates is None:
+                return findings
+            # Scoring deltas need the previous values of updated rows only
+            updated_ids = [finding["id"] for finding in findings if finding["id"] in previous_ids]
+            previous = fetch_findings_by_id(supabase, SCORING_COLUMNS, updated_ids) if updated_ids else {}
+            for finding in findings:
+                apply_delta(aggregates, previous.get(finding["id"]), finding)
+            return findings
+        
+        def classify(findings):
+            """Set the CMMC domain so new findings land already mapped"""
+            for finding, domain in zip(findings, classify_findings(findings, SYNC_DOMAIN_EMBEDDINGS)):
+                finding["domain"] = domain
+            return findings
+        
+        def upsert(findings):
+            writer.add(findings)
+        
+        stages = [("normalize", normalize)]
+        if severity_model:
+            stages.append(("enrich", enrich))
+        stages.append(("score", score))
+        if SYNC_CLASSIFY_DOMAINS:
+            stages.append(("classify", classify))
+        stages.append(("upsert", upsert))
+        
+        stage_stats = []
+        listing = {}
+        fetch_failed = False
+        try:
+            findings = iter_security_findings(
+                since, client=scc_client, listing=listing, finding_names=finding_names if targeted else None
+            )
+            stage_stats = run_pipeline(findings, stages)
+        except PipelineError as pipeline_error:
+            print(f"Error syncing security findings: {pipeline_error}")
+            fetch_failed = True
+            # Batches scored but dropped before the upsert stage were never written
+            aggregates = None
+        finally:
+            write_stats = writer.close()
+        
+        for stage in stage_stats:
+            print(f"Sync stage {stage}")
+        
+        stats["failed"] = write_stats["failed"]
+        
+        # A complete full listing is the only safe basis for resolving findings SCC no longer returns
+        if since is None and stats["fetched"] and not fetch_failed and not write_stats["failed"]:
+            try:
+                reconciled = reconcile_findings(
+                    supabase, fetched_ids, full_sync_window_start(), aggregates
+                )
+                stats["resolved"] = reconciled["resolved"]
+                stats["archived"] = reconciled["archived"]
+                print(f"Reconciliation: {reconciled}")
+            except Exception as reconcile_error:
+                print(f"Error reconciling missing findings: {reconcile_error}")
+                # Deltas may be partly applied, so rebuild the snapshot from the table
+                aggregates = None
+        
+        last_sync_stats.clear()
+        last_sync_stats.update(
+            stats,
+            full=since is None,
+            targeted=targeted,
+            stages=[stage.as_dict() for stage in stage_stats],
+            finished_at=datetime.now(timezone.utc).isoformat(),
+        )
+        print(
+            f"Sync results: {stats['inserted']} inserted, {stats['updated']} updated, "
+            f"{stats['unchanged']} unchanged, {stats['skipped']} skipped, {stats['resolved']} resolved, "
+            f"{stats['archived']} archived, {stats['failed']} failed ({write_stats['requests']} upsert requests)"
+        )
+        written = (
+            stats["inserted"] + stats["updated"] - stats["failed"]
+            + stats["resolved"] + stats["archived"]
+        )
+        
+        if write_stats["failed"]:
+            # Deltas assumed every row landed, so rebuild the snapshot from the table
+            aggregates = None
+        
+        if fetch_failed or write_stats["failed"]:
+            if written:
+                # Publish what was written; the watermark stays put so the next run retries
+                publish_sync(supabase, aggregates, record_history=False)
+            return False
+        
+        if not stats["fetched"]:
+            if targeted:
+                print("None of the notified findings were found")
+                return True
+            if since is not None:
+                # Nothing changed; leave the watermark where it is
+                print("No findings changed since the last sync")
+                return True
+            print("No findings fetched from Google Cloud")
+            return False
+        
+        publish_sync(supabase, aggregates, changed=written > 0)
+        
+        if targeted:
             return True
+        
+        # A newer duplicate copy skipped during listing must be relisted next run
+        deferred_since = parse_timestamp(listing.get("deferred_since"))
+        if deferred_since is not None and latest is not None and deferred_since < latest:
+            latest = deferred_since
+        
+        # Only a successful write moves the watermark forward
+        try:
+            if latest is not None and (watermark is None or latest > watermark):
+                save_sync_state(supabase, SCC_WATERMARK_KEY, latest.isoformat())
+            if since is None:
+                save_sync_state(supabase, SCC_LAST_FULL_SYNC_KEY, sync_started.isoformat())
+        except Exception as state_error:
+            print(f"Error saving sync state: {state_error}")
+        
+        return True
     
     except Exception as e:
         print(f"Error syncing findings to Supabase: {e}")
         return False
 
-if __name__ == "__main__":
-    # Run initial sync
-    sync_findings_to_supabase()
+class SyncDaemon:
+    """
+    Runs sync cycles forever, building the Supabase client and SCC session
+    once and reusing them. Credentials are only refreshed once expired, and
+    each cycle reports its setup and work time separately.
+
+    The delay between cycles adapts to how many findings the last cycle
+    changed. A push trigger naming findings syncs just those and keeps the
+    scheduled sync where it was; any other trigger ends the wait early with
+    an incremental sync.
+    """
     
-    # Schedule periodic sync (every hour)
-    sync_interval = int(os.getenv("SYNC_INTERVAL_SECONDS", "3600"))
+    def __init__(self, interval_seconds: int = SYNC_INTERVAL_SECONDS, trigger: SyncTrigger = None):
+        self.schedule = AdaptiveSchedule(interval_seconds)
+        self.trigger = trigger or SyncTrigger()
+        self.supabase = None
+        self.scc = None
+        self.cycles = 0
     
-    while True:
-        print(f"Waiting {sync_interval} seconds until next sync...")
-        time.sleep(sync_interval)
-        sync_findings_to_supabase()
\ No newline at end of file
+    def setup(self) -> None:
+        """Build any missing clients and refresh expired credentials"""
+        if self.supabase is None:
+            self.supabase = create_supabase_client()
+            if self.supabase is None:
+                raise RuntimeError("Supabase credentials not found")
+        if self.scc is None:
+            self.scc = SccSession()
+        if self.scc.ensure_fresh():
+            print("Refreshed Google Cloud credentials")
+    
+    def run_cycle(self, incremental_only: bool = False, finding_names=None) -> bool:
+        """Run one sync, timing setup and work separately"""
+        self.cycles += 1
+        started = time.perf_counter()
+        try:
+            self.setup()
+        except Exception as e:
+            print(f"Error setting up sync clients: {e}")
+            # Rebuilt from scratch on the next cycle
+            self.scc = None
+            return False
+        setup_seconds = time.perf_counter() - started
+        
+        success = sync_findings_to_supabase(
+            supabase=self.supabase,
+            scc_client=self.scc.client,
+            incremental_only=incremental_only,
+            finding_names=finding_names,
+        )
+        work_seconds = time.perf_counter() - started - setup_seconds
+        
+        print(
+            f"Sync cycle {self.cycles} {'succeeded' if success else 'failed'} in "
+            f"{setup_seconds + work_seconds:.2f}s (setup {setup_seconds:.2f}s, work {work_seconds:.2f}s, "
+            f"{self.scc.refreshes} credential refreshes so far)"
+        )
+        return success
+    
+    def run_forever(self) -> None:
+        start_trigger_server(self.trigger)
+        triggered = False
+        while True:
+            success = self.run_cycle(incremental_only=triggered)
+            delay = self.schedule.next_delay(last_sync_stats, success)
+            next_sync = time.monotonic() + delay
+            print(f"Waiting {delay:.0f} seconds until next sync (interval {self.schedule.interval:.0f}s)...")
+            while True:
+                trigger = self.trigger.wait(max(0.0, next_sync - time.monotonic()))
+                triggered = trigger is not None
+                if not triggered:
+                    break
+                reason, finding_names = trigger
+                print(f"Sync triggered early: {reason}")
+                if finding_names is None:
+                    break
+                # Only the notified findings are fetched; the schedule is left as it was
+                self.run_cycle(finding_names=finding_names)
+
+if __name__ == "__main__":
+    # Run an initial sync, then keep syncing on an adaptive schedule (every hour to start with)
+    SyncDaemon().run_forever()
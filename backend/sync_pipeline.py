@@ -0,0 +1,157 @@
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Batches buffered between two pipeline stages before the upstream stage blocks
+SYNC_PIPELINE_QUEUE_SIZE = int(os.getenv("SYNC_PIPELINE_QUEUE_SIZE", "4"))
+
+_END = object()
+
+
+class StageStats:
+    """Throughput counters for one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.batches = 0
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.waiting_seconds = 0.0
+        self.blocked_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.name,
+            "batches": self.batches,
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            # Time spent waiting for input and blocked on a full output queue
+            "waiting_seconds": round(self.waiting_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "items_per_second": round(self.items / self.busy_seconds) if self.busy_seconds else 0,
+        }
+
+    def __str__(self) -> str:
+        stats = self.as_dict()
+        return (
+            f"{self.name}: {self.items} items in {self.batches} batches, "
+            f"{stats['busy_seconds']}s busy ({stats['items_per_second']}/s), "
+            f"{stats['waiting_seconds']}s waiting, {stats['blocked_seconds']}s blocked"
+        )
+
+
+class PipelineError(RuntimeError):
+    """Raised when a stage fails; the original error is chained"""
+
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"{stage} stage failed: {error}")
+        self.stage = stage
+
+
+def run_pipeline(
+    source: Iterable[List[Any]],
+    stages: List[Tuple[str, Callable[[List[Any]], Optional[List[Any]]]]],
+    source_name: str = "fetch",
+    queue_size: int = SYNC_PIPELINE_QUEUE_SIZE,
+) -> List[StageStats]:
+    """
+    Run batches from source through stages, each on its own thread, connected
+    by bounded queues so a slow stage applies backpressure upstream.
+
+    A stage returns the batch for the next stage, or None/empty to drop it.
+    The first failure stops every stage and is raised as a PipelineError.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    stats = [StageStats(source_name)] + [StageStats(name) for name, _ in stages]
+    stop = threading.Event()
+    errors: List[PipelineError] = []
+
+    def put(target: "queue.Queue", item, stage_stats: StageStats) -> bool:
+        started = time.perf_counter()
+        try:
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            stage_stats.blocked_seconds += time.perf_counter() - started
+
+    def fail(stage: str, error: BaseException) -> None:
+        pipeline_error = PipelineError(stage, error)
+        pipeline_error.__cause__ = error
+        errors.append(pipeline_error)
+        stop.set()
+
+    def run_source() -> None:
+        stage_stats = stats[0]
+        iterator = iter(source)
+        try:
+            while not stop.is_set():
+                started = time.perf_counter()
+                batch = next(iterator, _END)
+                stage_stats.busy_seconds += time.perf_counter() - started
+                if batch is _END:
+                    break
+                stage_stats.batches += 1
+                stage_stats.items += len(batch)
+                if not put(queues[0], batch, stage_stats):
+                    break
+        except Exception as e:
+            fail(source_name, e)
+        finally:
+            if hasattr(iterator, "close"):
+                # Releases the source's own producers if we stopped early
+                iterator.close()
+            put(queues[0], _END, stage_stats)
+
+    def run_stage(index: int) -> None:
+        name, handler = stages[index]
+        stage_stats = stats[index + 1]
+        inbox = queues[index]
+        outbox = queues[index + 1] if index + 1 < len(queues) else None
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    batch = inbox.get(timeout=0.5)
+                except queue.Empty:
+                    stage_stats.waiting_seconds += time.perf_counter() - started
+                    if stop.is_set():
+                        return
+                    continue
+                stage_stats.waiting_seconds += time.perf_counter() - started
+                if batch is _END or stop.is_set():
+                    return
+
+                started = time.perf_counter()
+                result = handler(batch)
+                stage_stats.busy_seconds += time.perf_counter() - started
+                stage_stats.batches += 1
+                stage_stats.items += len(batch)
+                if outbox is not None and result:
+                    if not put(outbox, result, stage_stats):
+                        return
+        except Exception as e:
+            fail(name, e)
+        finally:
+            if outbox is not None:
+                put(outbox, _END, stage_stats)
+
+    threads = [threading.Thread(target=run_source, name=f"pipeline-{source_name}", daemon=True)]
+    threads += [
+        threading.Thread(target=run_stage, args=(index,), name=f"pipeline-{name}", daemon=True)
+        for index, (name, _) in enumerate(stages)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return stats
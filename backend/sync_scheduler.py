@@ -0,0 +1,187 @@
+import base64
+import hmac
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# Bounds for the adaptive delay between sync cycles; SYNC_INTERVAL_SECONDS is
+# the starting point
+SYNC_MIN_INTERVAL_SECONDS = int(os.getenv("SYNC_MIN_INTERVAL_SECONDS", "300"))
+SYNC_MAX_INTERVAL_SECONDS = int(os.getenv("SYNC_MAX_INTERVAL_SECONDS", "21600"))
+# Changed findings per cycle the schedule aims for; more shortens the
+# interval, fewer lengthens it, by at most a factor of two per cycle
+SYNC_TARGET_CHANGES = int(os.getenv("SYNC_TARGET_CHANGES", "100"))
+# Random +/- fraction applied to every delay so replicas don't sync in lockstep
+SYNC_INTERVAL_JITTER = float(os.getenv("SYNC_INTERVAL_JITTER", "0.1"))
+
+# Local hook that triggers an immediate incremental sync; disabled unless a
+# port and shared token are set
+SYNC_TRIGGER_HOST = os.getenv("SYNC_TRIGGER_HOST", "127.0.0.1")
+SYNC_TRIGGER_PORT = int(os.getenv("SYNC_TRIGGER_PORT", "0"))
+SYNC_TRIGGER_TOKEN = os.getenv("SYNC_TRIGGER_TOKEN", "")
+# Triggers arriving within this window are coalesced into one sync
+SYNC_TRIGGER_DEBOUNCE_SECONDS = float(os.getenv("SYNC_TRIGGER_DEBOUNCE_SECONDS", "10"))
+# Notified findings fetched by name in one triggered sync; a larger burst
+# falls back to an incremental sync from the watermark
+SYNC_TRIGGER_MAX_FINDINGS = int(os.getenv("SYNC_TRIGGER_MAX_FINDINGS", "100"))
+
+MAX_TRIGGER_BODY_BYTES = 64 * 1024
+
+# Full SCC finding names, e.g. organizations/123/sources/456/findings/abc
+FINDING_NAME = re.compile(r"^(organizations|folders|projects)/[\w.-]+/sources/[\w.-]+/findings/[\w.-]+$")
+
+
+class AdaptiveSchedule:
+    """
+    Picks the delay before the next sync from how much the last one changed.
+    A quiet cycle doubles the interval up to the maximum; a busy one shrinks
+    it towards the minimum so data stays fresh during incidents.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float,
+        min_seconds: float = SYNC_MIN_INTERVAL_SECONDS,
+        max_seconds: float = SYNC_MAX_INTERVAL_SECONDS,
+        target_changes: int = SYNC_TARGET_CHANGES,
+        jitter: float = SYNC_INTERVAL_JITTER,
+    ):
+        self.min_seconds = min_seconds
+        self.max_seconds = max(min_seconds, max_seconds)
+        self.target_changes = max(1, target_changes)
+        self.jitter = jitter
+        self.interval = self._clamp(interval_seconds)
+
+    def _clamp(self, seconds: float) -> float:
+        return min(self.max_seconds, max(self.min_seconds, seconds))
+
+    def next_delay(self, stats: Dict[str, Any], success: bool = True) -> float:
+        """Update the interval from a run's stats and return the jittered delay"""
+        if success:
+            changes = sum(int(stats.get(key) or 0) for key in ("inserted", "updated", "resolved", "archived"))
+            factor = min(2.0, max(0.5, self.target_changes / max(changes, 1)))
+            self.interval = self._clamp(self.interval * factor)
+        # A failed run keeps the current interval rather than reading its partial stats
+        return max(0.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+
+class SyncTrigger:
+    """Wakes the sync loop early when a push notification arrives"""
+
+    def __init__(
+        self,
+        debounce_seconds: float = SYNC_TRIGGER_DEBOUNCE_SECONDS,
+        max_findings: int = SYNC_TRIGGER_MAX_FINDINGS,
+    ):
+        self.debounce_seconds = debounce_seconds
+        self.max_findings = max_findings
+        self.received = 0
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._reasons = []
+        self._finding_names = set()
+        self._untargeted = False
+
+    def fire(self, reason: str, finding_name: Optional[str] = None) -> None:
+        """Record a trigger, naming the SCC finding it is about when known"""
+        with self._lock:
+            self.received += 1
+            self._reasons.append(reason)
+            if finding_name:
+                self._finding_names.add(finding_name)
+            else:
+                self._untargeted = True
+        self._event.set()
+
+    def wait(self, timeout: float) -> Optional[Tuple[str, Optional[List[str]]]]:
+        """
+        Sleep until the timeout or a trigger. Returns None when the timeout
+        elapsed, otherwise the trigger reasons and the finding names to sync.
+        The names are None when a trigger named no finding or too many
+        arrived together, so a sync from the watermark is needed instead.
+        """
+        if not self._event.wait(timeout):
+            return None
+        # Let a burst of notifications settle so they share one sync
+        time.sleep(self.debounce_seconds)
+        with self._lock:
+            self._event.clear()
+            reasons, self._reasons = self._reasons, []
+            names, self._finding_names = sorted(self._finding_names), set()
+            untargeted, self._untargeted = self._untargeted, False
+        shown = ", ".join(reasons[:3])
+        shown += f" and {len(reasons) - 3} more" if len(reasons) > 3 else ""
+        if untargeted or len(names) > self.max_findings:
+            return shown, None
+        return shown, names
+
+
+def parse_trigger(body: bytes) -> Tuple[str, Optional[str]]:
+    """
+    Describe a trigger from its request body: an SCC notification delivered
+    by a Pub/Sub push subscription, a JSON object with a reason, or nothing.
+    Returns the reason and the full name of the notified finding, if any.
+    """
+    try:
+        payload = json.loads(body or b"{}")
+        message = payload.get("message")
+        if isinstance(message, dict) and message.get("data"):
+            payload = json.loads(base64.b64decode(message["data"]))
+        finding = payload.get("finding") or {}
+        name = finding.get("name")
+        if isinstance(name, str) and FINDING_NAME.match(name):
+            return f"notification for {name}", name
+        return str(payload.get("reason") or "manual trigger"), None
+    except Exception:
+        return "manual trigger", None
+
+
+def start_trigger_server(
+    trigger: SyncTrigger,
+    host: str = SYNC_TRIGGER_HOST,
+    port: int = SYNC_TRIGGER_PORT,
+    token: str = SYNC_TRIGGER_TOKEN,
+) -> Optional[ThreadingHTTPServer]:
+    """Serve POST /trigger on a background thread, or return None if not configured"""
+    if not port:
+        return None
+    if not token:
+        print("SYNC_TRIGGER_TOKEN is not set; not starting the sync trigger hook")
+        return None
+
+    class TriggerHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            url = urlsplit(self.path)
+            if url.path != "/trigger":
+                self.send_error(404)
+                return
+            # Pub/Sub push can't set headers, so the token may also be a query parameter
+            scheme, _, supplied = self.headers.get("Authorization", "").partition(" ")
+            if scheme.lower() != "bearer":
+                supplied = parse_qs(url.query).get("token", [""])[0]
+            if not hmac.compare_digest(supplied.strip().encode("utf-8"), token.encode("utf-8")):
+                self.send_error(401)
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_TRIGGER_BODY_BYTES:
+                self.send_error(413)
+                return
+            trigger.fire(*parse_trigger(self.rfile.read(length)))
+            # Pub/Sub push treats any 2xx as an acknowledgement
+            self.send_response(202)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), TriggerHandler)
+    threading.Thread(target=server.serve_forever, name="sync-trigger", daemon=True).start()
+    print(f"Listening for sync triggers on http://{host}:{server.server_port}/trigger")
+    return server
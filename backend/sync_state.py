@@ -0,0 +1,48 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+SYNC_STATE_TABLE = "sync_state"
+
+# Highest SCC event time written by a successful sync
+SCC_WATERMARK_KEY = "scc_watermark"
+# Start time of the last successful full reconciliation
+SCC_LAST_FULL_SYNC_KEY = "scc_last_full_sync"
+
+
+def load_sync_state(supabase, key: str) -> Optional[str]:
+    """Read a persisted sync state value, or None if it has never been set"""
+    try:
+        response = supabase.table(SYNC_STATE_TABLE).select("value").eq("key", key).execute()
+    except Exception as e:
+        print(f"Error fetching sync state {key}: {e}")
+        return None
+
+    if hasattr(response, "error") and response.error is not None:
+        print(f"Error fetching sync state {key}: {response.error}")
+        return None
+    if not response.data:
+        return None
+    return response.data[0]["value"]
+
+
+def save_sync_state(supabase, key: str, value: str) -> None:
+    """Persist a sync state value"""
+    supabase.table(SYNC_STATE_TABLE).upsert({
+        "key": key,
+        "value": value,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }).execute()
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse a stored ISO timestamp as an aware UTC datetime"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        print(f"Ignoring invalid sync timestamp: {value}")
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
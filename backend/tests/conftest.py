@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The backend modules are flat and imported by plain name, as the services do
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
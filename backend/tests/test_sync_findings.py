@@ -0,0 +1,161 @@
+import functools
+
+import pytest
+
+import reconcile
+import sync_findings
+from batch_writer import BatchUpserter
+from compliance_snapshot import load_snapshot
+from fake_scc import FakeSecurityCenterClient
+from fake_supabase import FakeAPIError, FakeSupabase
+from findings_query import FINDINGS_TABLE, fetch_all_findings
+from score_history import HISTORY_TABLE
+from scoring import SCORING_COLUMNS, aggregate_arrays, build_score_arrays, counts_toward_score, total_severity_counts
+from sync_state import SCC_WATERMARK_KEY
+
+
+class FlakySupabase(FakeSupabase):
+    """Fails every findings upsert that contains one of failing_ids"""
+
+    def __init__(self):
+        super().__init__()
+        self.failing_ids = set()
+
+    def _execute(self, query):
+        if (
+            query.table == FINDINGS_TABLE
+            and query.operation == "upsert"
+            and any(row["id"] in self.failing_ids for row in query.payload)
+        ):
+            raise FakeAPIError("simulated write failure")
+        return super()._execute(query)
+
+
+def fake_severity_model(texts, batch_size=None, truncation=None):
+    """Stands in for the sentiment pipeline with a score derived from the text"""
+    if isinstance(texts, str):
+        texts = [texts]
+    return [{"label": "negative", "score": (len(text) % 100) / 100} for text in texts]
+
+
+def table_severity_counts(supabase):
+    counts = {}
+    for row in fetch_all_findings(supabase, ["id", "severity", "status"]):
+        if counts_toward_score(row):
+            counts[row["severity"]] = counts.get(row["severity"], 0) + 1
+    return counts
+
+
+def latest_history_counts(supabase):
+    raw = [row for row in supabase.tables[HISTORY_TABLE].values() if row["resolution"] == "raw"]
+    latest = max(raw, key=lambda row: row["bucket"])
+    return {severity: count for severity, count in latest["severity_counts"].items() if count}
+
+
+@pytest.fixture
+def sync(monkeypatch):
+    monkeypatch.setenv("GOOGLE_SCC_PARENTS", "organizations/test")
+    monkeypatch.setenv("SYNC_MODE", "incremental")
+    monkeypatch.setenv("ENRICHMENT_CACHE_ENABLED", "false")
+    monkeypatch.setattr(sync_findings, "SYNC_DOMAIN_EMBEDDINGS", False)
+    monkeypatch.setattr(sync_findings, "sync_severity_model", lambda: None)
+    # Failing rows are retried and split without waiting between attempts
+    monkeypatch.setattr(sync_findings, "BatchUpserter", functools.partial(BatchUpserter, backoff_seconds=0))
+    return sync_findings.sync_findings_to_supabase
+
+
+def test_severity_counts_match_table_after_failed_sync(sync):
+    scc = FakeSecurityCenterClient(2000, seed=1)
+    supabase = FlakySupabase()
+    assert sync(supabase=supabase, scc_client=scc)
+
+    scc.churn(0.2, resolve_fraction=0.5)
+    supabase.failing_ids = {f"f{index:08d}" for index in range(0, 2000, 37)}
+    assert not sync(supabase=supabase, scc_client=scc)
+
+    scc.churn(0.2, resolve_fraction=0.5)
+    supabase.failing_ids = set()
+    assert sync(supabase=supabase, scc_client=scc)
+
+    expected = table_severity_counts(supabase)
+    aggregates, _ = load_snapshot(supabase)
+    assert total_severity_counts(aggregates) == expected
+    assert latest_history_counts(supabase) == expected
+
+
+def test_snapshot_keeps_ai_blending(sync, monkeypatch):
+    scc = FakeSecurityCenterClient(2000, seed=2)
+    supabase = FakeSupabase()
+    # Rows written before the model was available are enriched by the next sync
+    assert sync(supabase=supabase, scc_client=scc)
+    monkeypatch.setattr(sync_findings, "sync_severity_model", lambda: fake_severity_model)
+    scc.churn(0.2, resolve_fraction=0.5)
+    assert sync(supabase=supabase, scc_client=scc, force_full=True)
+    scc.churn(0.2, resolve_fraction=0.5)
+    assert sync(supabase=supabase, scc_client=scc)
+
+    rows = fetch_all_findings(supabase, SCORING_COLUMNS)
+    assert all(row["ai_severity"] is not None for row in rows if counts_toward_score(row))
+    expected = aggregate_arrays(build_score_arrays(rows))
+    aggregates, _ = load_snapshot(supabase)
+    for cat, data in expected.items():
+        assert aggregates[cat]["ai_weighted_sum"] == pytest.approx(data["ai_weighted_sum"])
+    assert any(data["ai_weighted_sum"] != pytest.approx(data["weighted_sum"]) for data in aggregates.values())
+
+
+def test_archived_findings_are_not_reinserted(sync, monkeypatch):
+    monkeypatch.setattr(
+        sync_findings, "reconcile_findings", functools.partial(reconcile.reconcile_findings, mode="archive")
+    )
+    scc = FakeSecurityCenterClient(2000, seed=3)
+    supabase = FakeSupabase()
+    assert sync(supabase=supabase, scc_client=scc)
+    scc.churn(0.2, resolve_fraction=0.5)
+    assert sync(supabase=supabase, scc_client=scc, force_full=True)
+    assert all(counts_toward_score(row) for row in fetch_all_findings(supabase, ["id", "status"]))
+
+    # The overlap window lists the inactive findings again
+    assert sync(supabase=supabase, scc_client=scc)
+    assert all(counts_toward_score(row) for row in fetch_all_findings(supabase, ["id", "status"]))
+    assert sync_findings.last_sync_stats["inserted"] == 0
+
+
+def test_unchanged_rows_without_domain_are_classified(sync, monkeypatch):
+    scc = FakeSecurityCenterClient(2000, seed=4)
+    supabase = FakeSupabase()
+    monkeypatch.setattr(sync_findings, "SYNC_CLASSIFY_DOMAINS", False)
+    monkeypatch.setattr(sync_findings, "sync_severity_model", lambda: fake_severity_model)
+    assert sync(supabase=supabase, scc_client=scc)
+    enriched = {row["id"]: row["ai_severity"] for row in fetch_all_findings(supabase, ["id", "ai_severity"])}
+
+    # Content is unchanged, but the rows are rewritten with a domain and keep their AI severity
+    monkeypatch.setattr(sync_findings, "SYNC_CLASSIFY_DOMAINS", True)
+    monkeypatch.setattr(sync_findings, "sync_severity_model", lambda: None)
+    assert sync(supabase=supabase, scc_client=scc, force_full=True)
+    rows = fetch_all_findings(supabase, ["id", "domain", "ai_severity"])
+    assert all(row["domain"] for row in rows)
+    assert {row["id"]: row["ai_severity"] for row in rows} == enriched
+
+    assert sync(supabase=supabase, scc_client=scc, force_full=True)
+    assert sync_findings.last_sync_stats["updated"] == 0
+
+
+def test_triggered_sync_fetches_only_notified_findings(sync):
+    scc = FakeSecurityCenterClient(2000, seed=5)
+    supabase = FakeSupabase()
+    assert sync(supabase=supabase, scc_client=scc)
+    watermark = supabase.tables["sync_state"][(SCC_WATERMARK_KEY,)]["value"]
+
+    before = list(scc.event_times)
+    scc.churn(0.2, resolve_fraction=0.5)
+    churned = [index for index, observed in enumerate(scc.event_times) if observed != before[index]]
+    names = [f"organizations/test/sources/1/findings/f{index:08d}" for index in churned[:3]]
+
+    scc.reset_counters()
+    assert sync(supabase=supabase, scc_client=scc, finding_names=names)
+    assert scc.findings_served == 3
+    assert sync_findings.last_sync_stats["updated"] == 3
+    # Everything else is left to the next scheduled sync from the unchanged watermark
+    assert supabase.tables["sync_state"][(SCC_WATERMARK_KEY,)]["value"] == watermark
+    assert sync(supabase=supabase, scc_client=scc)
+    assert sync_findings.last_sync_stats["updated"] == len(churned) - 3
@@ -0,0 +1,33 @@
+import base64
+import json
+
+from sync_scheduler import SyncTrigger, parse_trigger
+
+FINDING = "organizations/123/sources/456/findings/abc"
+
+
+def push_body(payload):
+    return json.dumps({"message": {"data": base64.b64encode(json.dumps(payload).encode()).decode()}}).encode()
+
+
+def test_parse_trigger_reads_the_notified_finding():
+    assert parse_trigger(push_body({"finding": {"name": FINDING}})) == (f"notification for {FINDING}", FINDING)
+    assert parse_trigger(b'{"reason": "manual"}') == ("manual", None)
+    # Anything that isn't a finding name never reaches an SCC filter
+    assert parse_trigger(push_body({"finding": {"name": f'{FINDING}" OR name="x'}}))[1] is None
+
+
+def test_trigger_targets_findings_unless_one_names_none():
+    trigger = SyncTrigger(debounce_seconds=0, max_findings=2)
+    trigger.fire("a", FINDING)
+    trigger.fire("b", FINDING)
+    assert trigger.wait(0) == ("a, b", [FINDING])
+    assert trigger.wait(0) is None
+
+    trigger.fire("a", FINDING)
+    trigger.fire("manual")
+    assert trigger.wait(0) == ("a, manual", None)
+
+    for name in "xyz":
+        trigger.fire(name, f"{FINDING}{name}")
+    assert trigger.wait(0)[1] is None